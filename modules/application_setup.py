@@ -12,6 +12,9 @@ SEPARATOR = "-------------------------------------------------------------------
 
 class ApplicationSetup:
     """Handles configuration loading, logging setup, and initial checks."""
+
+    # Answers accepted by confirm()
+    CONFIRM_RESPONSES = {'y': True, 'n': False, 'c': None}
     
     def __init__(self, pwd, config_path, config_template_path):
         self.pwd = pwd
@@ -28,9 +31,9 @@ class ApplicationSetup:
         # Perform initial setup tasks
         self.handle_auto_update()  # 🔹 This may modify config.ini
 
-        # Ensure config is reloaded if changed
-        self.config_manager = ConfigManager(self.config_path, pwd)  
-        self.config = self.config_manager.config  
+        # Reload config; only parsed again if the update actually changed config.ini
+        self.config_manager = ConfigManager(self.config_path, pwd)
+        self.config = self.config_manager.config
 
         # Ensure config file exists
         self.ensure_config_exists()
@@ -40,7 +43,7 @@ class ApplicationSetup:
 
         # Exit script if dry run is not enabled and root permissions are missing 
         if not self.dry_run and os.geteuid() != 0:
-            logging.error(f"This script must be run as root. Use 'sudo python3 {__file__}'")
+            logging.error("This script must be run as root. Use 'sudo python3 %s'", __file__)
             sys.exit(1)
 
     def handle_auto_update(self):
@@ -48,6 +51,8 @@ class ApplicationSetup:
         auto_update = self.config.get('settings', 'auto_update_script', fallback=False)
         if auto_update == "True":
             GitManager.self_update(self.pwd, self.config_path, self.config_template_path)
+        elif "--non-interactive" in sys.argv or self.config.get('settings', 'auto_confirm', fallback="False") == "True":
+            logging.info("Skipping MoodleUpdater update check in non-interactive mode.")
         else:
             logging.info(SEPARATOR)
             if self.confirm("Pull MoodleUpdater from GitHub?", "n"):
@@ -56,7 +61,7 @@ class ApplicationSetup:
     def ensure_config_exists(self):
         """Ensures the config file exists, otherwise creates one from the template."""
         if not os.path.exists(self.config_path):
-            logging.error(f"Configuration file '{self.config_path}' not found.")
+            logging.error("Configuration file '%s' not found.", self.config_path)
             if os.path.exists(self.config_template_path):
                 shutil.copy(self.config_template_path, self.config_path)
                 logging.info("Configuration file has been created.")
@@ -76,7 +81,7 @@ class ApplicationSetup:
         # Detect Moodle version
         checker = MoodleVersionChecker(self.full_path, None, None)
         local_release, _ = checker.get_local_version()
-        logging.info(f"Moodle version detected: {local_release}")
+        logging.info("Moodle version detected: %s", local_release)
         logging.info(SEPARATOR)
 
         # Log if dry-run mode is enabled
@@ -99,7 +104,7 @@ class ApplicationSetup:
         - False if user declines (n)
         - None if user cancels (c) or timeout occurs with no valid default.
         """
-        valid_responses = {'y': True, 'n': False, 'c': None}
+        valid_responses = ApplicationSetup.CONFIRM_RESPONSES
         option = "Yes(y)/No(n)/Cancel(c)" + (f" Default={default}" if default else "")
 
         if timeout:
@@ -123,7 +128,7 @@ class ApplicationSetup:
 
         except TimeoutError:  # Catch built-in TimeoutError
             print("\n")
-            logging.warning(f"Timeout reached! Using default response: {default or 'No response'}")
+            logging.warning("Timeout reached! Using default response: %s", default or 'No response')
             return valid_responses.get(default.lower(), None)
 
         finally:
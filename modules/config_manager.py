@@ -1,20 +1,97 @@
+import atexit
 import configparser
 import logging
 import os
+import queue
 import re
-from logging.handlers import RotatingFileHandler
+from itertools import groupby
+from operator import itemgetter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Matches $CFG->dbname, $CFG->dbuser and $CFG->dbpass in Moodle's config.php.
+# Bytes pattern: the file is scanned undecoded and only the captured values are decoded.
+MOODLE_DB_SETTING = re.compile(rb"\$CFG->(?P<key>dbname|dbuser|dbpass)\s*=\s*'(?P<value>[^']+)'", re.ASCII)
+
+# Parsed config.php values by path, along with the mtime they were read at.
+_moodle_config_cache = {}
+
+# Parsed config.ini files by (path, mtime, size).
+_config_cache = {}
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that writes through a large buffer instead of flushing every record.
+
+    WARNING and above are flushed right away; everything else is flushed by
+    FlushingQueueListener once the log queue runs empty, or when the handler is closed.
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, buffer_size=1 << 20):
+        self.buffer_size = buffer_size
+        self.size = 0
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount)
+
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                      encoding=self.encoding, errors=self.errors)
+        self.size = os.fstat(stream.fileno()).st_size
+        return stream
+
+    def emit(self, record):
+        # The base class seeks the stream before each record to decide on rollover,
+        # which flushes the buffer; keep track of the file size here instead.
+        try:
+            msg = self.format(record) + self.terminator
+            # Count bytes, not characters: paths and names in the log may be non-ASCII.
+            # The stream's encoding is the resolved codec ("locale" is not one).
+            msg_size = len(msg.encode(self.stream.encoding, self.stream.errors))
+            if self.maxBytes > 0 and self.size and self.size + msg_size >= self.maxBytes:
+                self.doRollover()
+            self.stream.write(msg)
+            self.size += msg_size
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+class FlushingQueueListener(QueueListener):
+    """QueueListener that flushes its handlers whenever it is about to wait for new records."""
+
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
 
 class ConfigManager:
     """Manages configuration loading and logging setup."""
+    # Thread writing the log file, see configure_logging()
+    log_listener = None
+
     def __init__(self, config_path, script_dir=None):
         self.config_path = config_path
         self.script_dir = script_dir or os.path.dirname(os.path.abspath(config_path))
         self.config = self.load_config()
 
     def load_config(self):
-        """Load configuration from a file."""
+        """Load configuration from a file.
+
+        A file that has not changed since it was last parsed is not parsed again,
+        so reloading after a self-update that left config.ini alone costs a stat.
+        """
+        try:
+            st = os.stat(self.config_path)
+            cache_key = (self.config_path, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            cache_key = None
+        if cache_key in _config_cache:
+            return _config_cache[cache_key]
+
         config = configparser.ConfigParser(interpolation=None)
         config.read(self.config_path)
+        if cache_key:
+            _config_cache[cache_key] = config
         #logging.info(f"Loaded configuration from {self.config_path}")
         return config
 
@@ -30,18 +107,41 @@ class ConfigManager:
         if not os.path.isabs(log_file_path):
             log_file_path = os.path.join(self.script_dir, log_file_path)
 
+        log_format = "%(asctime)s - %(levelname)s - %(message)s"
         handlers = []
         if log_to_console:
             handlers.append(logging.StreamHandler())
         if log_to_file:
-            handlers.append(RotatingFileHandler(log_file_path, maxBytes=5 * 1024 * 1024, backupCount=3))
-
-        logging.basicConfig(level=numeric_level, format="%(asctime)s - %(levelname)s - %(message)s", handlers=handlers)
-        logging.info(f"Logging configured. Level: {log_level}")
+            # The file handler writes (and rotates) on a listener thread, so the
+            # backup, dump and monitor threads only enqueue their records.
+            # The console stays synchronous to keep log lines ahead of prompts.
+            # Writes are buffered and flushed in batches, see BufferedRotatingFileHandler.
+            file_handler = BufferedRotatingFileHandler(log_file_path, maxBytes=20 * 1024 * 1024, backupCount=3)
+            file_handler.setFormatter(logging.Formatter(log_format))
+            log_queue = queue.SimpleQueue()
+            ConfigManager.log_listener = FlushingQueueListener(log_queue, file_handler)
+            ConfigManager.log_listener.start()
+            atexit.register(ConfigManager.stop_log_listener)
+            queue_handler = QueueHandler(log_queue)
+            # Only merge the message arguments here; the file handler adds the prefix.
+            queue_handler.setFormatter(logging.Formatter("%(message)s"))
+            handlers.append(queue_handler)
+
+        logging.basicConfig(level=numeric_level, format=log_format, handlers=handlers)
+        logging.info("Logging configured. Level: %s", log_level)
         if log_to_console:
             logging.info("Logging to console enabled.")
         if log_to_file:
-            logging.info(f"Logging to file enabled. File path: {log_file_path}")
+            logging.info("Logging to file enabled. File path: %s", log_file_path)
+
+    @staticmethod
+    def stop_log_listener():
+        """Write out all queued log records and stop the file logging thread."""
+        if ConfigManager.log_listener:
+            ConfigManager.log_listener.stop()
+            for handler in ConfigManager.log_listener.handlers:
+                handler.flush()
+            ConfigManager.log_listener = None
 
     @staticmethod
     def read_moodle_config(config_path):
@@ -49,27 +149,27 @@ class ConfigManager:
         cfg_values = {}
 
         try:
-            with open(config_path, 'r') as file:
-                content = file.read()
+            # Reuse the values parsed earlier unless the file has changed since.
+            mtime = os.stat(config_path).st_mtime_ns
+            cached = _moodle_config_cache.get(config_path)
+            if cached and cached[0] == mtime:
+                return dict(cached[1])
 
-            # Regular expressions to match $CFG->dbname, $CFG->dbuser, and $CFG->dbpass
-            patterns = {
-                'dbname': r"\$CFG->dbname\s*=\s*'([^']+)'",
-                'dbuser': r"\$CFG->dbuser\s*=\s*'([^']+)'",
-                'dbpass': r"\$CFG->dbpass\s*=\s*'([^']+)'",
-            }
+            with open(config_path, 'rb') as file:
+                content = file.read()
 
-            for key, pattern in patterns.items():
-                match = re.search(pattern, content)
-                if match:
-                    cfg_values[key] = match.group(1)
-                else:
-                    cfg_values[key] = None
+            # One pass over the file; the first assignment of each key wins.
+            cfg_values = {'dbname': None, 'dbuser': None, 'dbpass': None}
+            for match in MOODLE_DB_SETTING.finditer(content):
+                key = match['key'].decode('ascii')
+                if cfg_values[key] is None:
+                    cfg_values[key] = match['value'].decode('utf-8')
+            _moodle_config_cache[config_path] = (mtime, dict(cfg_values))
 
         except FileNotFoundError:
-            logging.error(f"File {config_path} not found.")
+            logging.error("File %s not found.", config_path)
         except Exception as e:
-            logging.error(f"An error occurred while reading the Moodle config: {e}")
+            logging.error("An error occurred while reading the Moodle config: %s", e)
 
         return cfg_values
 
@@ -83,15 +183,21 @@ class ConfigManager:
             config.read(config_path)
             template.read(template_path)
 
-            all_sections = set(config.sections()).union(set(template.sections()))
-            for section in all_sections:
-                config_items = set(config.items(section)) if config.has_section(section) else set()
-                template_items = set(template.items(section)) if template.has_section(section) else set()
-                added = template_items - config_items
-                removed = config_items - template_items
+            def flatten(parser):
+                return {(section, key): value for section in parser.sections() for key, value in parser.items(section)}
+
+            config_items = flatten(config)
+            template_items = flatten(template)
+            # Added: keys missing from config.ini or holding a different value than the template.
+            # Removed: keys only present in config.ini.
+            added = {k: v for k, v in template_items.items() if config_items.get(k) != v}
+            removed = {k: v for k, v in config_items.items() if k not in template_items}
 
-                if added or removed:
-                    logging.warning(f"Differences in section {section}: Added={added}, Removed={removed}")
+            for section, keys in groupby(sorted(added.keys() | removed.keys()), key=itemgetter(0)):
+                keys = list(keys)
+                section_added = {k[1]: added[k] for k in keys if k in added}
+                section_removed = {k[1]: removed[k] for k in keys if k in removed}
+                logging.warning("Differences in section %s: Added=%s, Removed=%s", section, section_added, section_removed)
 
         except Exception as e:
-            logging.error(f"Error while checking configuration differences: {e}")
\ No newline at end of file
+            logging.error("Error while checking configuration differences: %s", e)
\ No newline at end of file
@@ -12,31 +12,80 @@ class GitManager:
 
     @staticmethod
     def get_commit_details(commit_hash, pwd):
-        """Retrieve commit details (time, author, summary) for a given commit hash."""
+        """Retrieve commit details (hash, time, author, summary) for a given commit hash or ref."""
         try:
             result = subprocess.run(
-                ['git', '-C', pwd, 'show', '-s', '--format=%ci|%an|%s', commit_hash],
+                ['git', '-C', pwd, 'show', '-s', '--format=%H|%ci|%an|%s', commit_hash],
                 capture_output=True, text=True, check=True
             )
-            # Use maxsplit=2 so a commit summary containing literal '|' is
+            # Use maxsplit=3 so a commit summary containing literal '|' is
             # preserved intact rather than truncated or causing the length
             # check below to fail.
-            output = result.stdout.strip().split('|', 2)
+            output = result.stdout.strip().split('|', 3)
 
-            if len(output) == 3:
-                return output  # Returns (time, author, summary)
+            if len(output) == 4:
+                return output  # Returns (hash, time, author, summary)
             else:
-                logging.warning(f"Unexpected output format from Git for commit {commit_hash}: {output}")
-                return "Unknown", "Unknown", "Unknown"
+                logging.warning("Unexpected output format from Git for commit %s: %s", commit_hash, output)
+                return "Unknown", "Unknown", "Unknown", "Unknown"
         
         except subprocess.CalledProcessError as e:
-            logging.error(f"Failed to retrieve commit details for {commit_hash}: {e.stderr}")
+            logging.error("Failed to retrieve commit details for %s: %s", commit_hash, e.stderr)
         except FileNotFoundError:
             logging.error("Git command not found. Ensure Git is installed and accessible.")
         except Exception as e:
-            logging.error(f"Unexpected error retrieving commit details: {e}")
+            logging.error("Unexpected error retrieving commit details: %s", e)
 
-        return "Unknown", "Unknown", "Unknown"
+        return "Unknown", "Unknown", "Unknown", "Unknown"
+
+    @staticmethod
+    def parse_status(status_output):
+        """Parse `git status --porcelain=v2 --branch` output into (branch, commit, upstream, has_local_changes).
+
+        upstream is the tracked remote branch (e.g. "origin/main"), or None if there is none.
+        """
+        branch, commit, upstream, has_local_changes = "Unknown", "Unknown", None, False
+        for line in status_output.splitlines():
+            if line.startswith('# branch.head '):
+                branch = line[len('# branch.head '):]
+            elif line.startswith('# branch.oid '):
+                commit = line[len('# branch.oid '):]
+            elif line.startswith('# branch.upstream '):
+                upstream = line[len('# branch.upstream '):]
+            elif line and not line.startswith('#'):
+                has_local_changes = True
+        return branch, commit, upstream, has_local_changes
+
+    @staticmethod
+    def get_remote_commit(upstream, pwd):
+        """Return the commit the remote branch upstream ("<remote>/<branch>") points to, or None if unknown.
+
+        Uses `git ls-remote`, which only asks the remote for that one ref and fetches no objects.
+        """
+        remote, _, branch = upstream.partition('/')
+        try:
+            result = subprocess.run(
+                ['git', '-C', pwd, 'ls-remote', remote, f'refs/heads/{branch}'],
+                capture_output=True, text=True, check=True
+            )
+        except subprocess.CalledProcessError as e:
+            logging.warning("Querying %s failed: %s", upstream, e.stderr)
+            return None
+        fields = result.stdout.split()
+        return fields[0] if fields else None
+
+    @staticmethod
+    def python_files_changed(old_commit, new_commit, pwd):
+        """Return True if any .py file differs between old_commit and new_commit (or if that cannot be determined)."""
+        try:
+            result = subprocess.run(
+                ['git', '-C', pwd, 'diff', '--name-only', old_commit, new_commit, '--', '*.py'],
+                capture_output=True, text=True, check=True
+            )
+        except subprocess.CalledProcessError as e:
+            logging.warning("Listing changed files failed: %s", e.stderr)
+            return True
+        return bool(result.stdout.strip())
 
     @staticmethod
     def self_update(pwd, CONFIG_PATH, CONFIG_TEMPLATE_PATH):
@@ -49,52 +98,42 @@ class GitManager:
                 logging.warning("Not a Git repository. Skipping self-update.")
                 return
 
-            # Get current branch
+            # Branch, HEAD commit and uncommitted changes from a single git call
             try:
-                branch_result = subprocess.run(
-                    ['git', '-C', pwd, 'rev-parse', '--abbrev-ref', 'HEAD'],
+                status_result = subprocess.run(
+                    ['git', '-C', pwd, 'status', '--porcelain=v2', '--branch'],
                     capture_output=True, text=True, check=True
                 )
             except subprocess.CalledProcessError as e:
-                logging.error(f"Retrieving current branch failed: {e.stderr}")
-            current_branch = branch_result.stdout.strip()
-            logging.info(f"Current branch: {current_branch}")
-
-            # Get current commit details
-            try:
-                current_commit_result = subprocess.run(
-                    ['git', '-C', pwd, 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
-                )
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Retrieving commit details failed: {e.stderr}")
-            current_commit = current_commit_result.stdout.strip() if current_commit_result.returncode == 0 else "Unknown"
-            current_commit_time, current_commit_author, current_commit_summary = GitManager.get_commit_details(current_commit, pwd)
+                logging.error("Retrieving repository status failed: %s", e.stderr)
+            current_branch, current_commit, upstream, local_changes = GitManager.parse_status(status_result.stdout)
+            _, current_commit_time, current_commit_author, current_commit_summary = GitManager.get_commit_details(current_commit, pwd)
 
-            logging.info(f"Current commit: {current_commit}")
-            logging.info(f"Commit time: {current_commit_time}")
-            logging.info(f"Author: {current_commit_author}")
-            logging.info(f"Summary: {current_commit_summary}")
+            logging.info(
+                "Current branch: %s\nCurrent commit: %s\nCommit time: %s\nAuthor: %s\nSummary: %s",
+                current_branch, current_commit, current_commit_time, current_commit_author, current_commit_summary
+            )
 
-            # Check for uncommitted changes
-            try:
-                status_result = subprocess.run(
-                    ['git', '-C', pwd, 'status', '--porcelain'], capture_output=True, text=True, check=True
-                )
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Checking for uncommited changes failed: {e.stderr}")
-            if status_result.stdout.strip():
+            if local_changes:
                 logging.warning("Local changes detected. Skipping self-update to avoid conflicts.")
                 ConfigManager.check_config_differences(CONFIG_PATH, CONFIG_TEMPLATE_PATH)
                 return
 
             # Pull the latest changes from the remote repository to update the script.
             logging.info("Checking for updates...")
+            # Asking the remote for the branch tip is much cheaper than a pull;
+            # nothing needs to be fetched if it is the commit we are on.
+            if upstream and GitManager.get_remote_commit(upstream, pwd) == current_commit:
+                logging.info("The script is already up to date.")
+                ConfigManager.check_config_differences(CONFIG_PATH, CONFIG_TEMPLATE_PATH)
+                return
+
             try:
                 pull_result = subprocess.run(
                     ['git', '-C', pwd, 'pull', '--rebase'], capture_output=True, text=True, check=True
                 )
             except subprocess.CalledProcessError as e:
-                logging.error(f"Git pull failed: {e.stderr}")
+                logging.error("Git pull failed: %s", e.stderr)
 
 
             if "Already up to date." in pull_result.stdout:
@@ -102,33 +141,31 @@ class GitManager:
                 ConfigManager.check_config_differences(CONFIG_PATH, CONFIG_TEMPLATE_PATH)
             else:
                 # Get updated commit details
-                try:
-                    updated_commit_result = subprocess.run(
-                        ['git', '-C', pwd, 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
-                    )
-                except subprocess.CalledProcessError as e:
-                    logging.error(f"Retrieving updated commit failed: {e.stderr}")
-
-                updated_commit = updated_commit_result.stdout.strip() if updated_commit_result.returncode == 0 else "Unknown"
-                updated_commit_time, updated_commit_author, updated_commit_summary = GitManager.get_commit_details(updated_commit, pwd)
-
-                logging.info(f"Updated from commit {current_commit} to commit {updated_commit} on branch {current_branch}")
-                logging.info(f"Old commit details:")
-                logging.info(f"  Time: {current_commit_time}")
-                logging.info(f"  Author: {current_commit_author}")
-                logging.info(f"  Summary: {current_commit_summary}")
-                logging.info(f"New commit details:")
-                logging.info(f"  Time: {updated_commit_time}")
-                logging.info(f"  Author: {updated_commit_author}")
-                logging.info(f"  Summary: {updated_commit_summary}")
+                updated_commit, updated_commit_time, updated_commit_author, updated_commit_summary = GitManager.get_commit_details('HEAD', pwd)
+
+                logging.info(
+                    "Updated from commit %s to commit %s on branch %s\n"
+                    "Old commit details:\n  Time: %s\n  Author: %s\n  Summary: %s\n"
+                    "New commit details:\n  Time: %s\n  Author: %s\n  Summary: %s",
+                    current_commit, updated_commit, current_branch,
+                    current_commit_time, current_commit_author, current_commit_summary,
+                    updated_commit_time, updated_commit_author, updated_commit_summary
+                )
 
                 ConfigManager.check_config_differences(CONFIG_PATH, CONFIG_TEMPLATE_PATH)
 
+                # Restarting re-imports everything; only needed if Python code changed.
+                if not GitManager.python_files_changed(current_commit, updated_commit, pwd):
+                    logging.info("No Python files changed. Continuing without restart.")
+                    return
+
                 # Restart the script with the updated version
                 logging.info("Restarting the script...")
                 logging.info(SEPARATOR)
+                # execv replaces the process without running atexit handlers.
+                ConfigManager.stop_log_listener()
                 os.execv(sys.executable, [sys.executable] + sys.argv)
 
         except Exception as e:
-            logging.error(f"Error during self-update: {e}")
+            logging.error("Error during self-update: %s", e)
             logging.info("Continuing with the current version.")
\ No newline at end of file
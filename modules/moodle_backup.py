@@ -1,16 +1,27 @@
+import fcntl
 import os
+import re
 import time
 import logging
 import select
 import shutil
 import subprocess
 import sys
+import tempfile
 import glob
+import grp
+import pwd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from modules.application_setup import ApplicationSetup
 from modules.system_monitor import SystemMonitor
 
 SEPARATOR = "-------------------------------------------------------------------------"
 
+# rsync --info=progress2 line, e.g. "  1,234,567  45%   10.00MB/s    0:00:10 (xfr#5, to-chk=10/100)"
+RSYNC_PROGRESS = re.compile(r"^[\d,.]+[KMGT]?\s+\d+%")
+# rsync --info=stats2 line with the size of all files in the transfer
+RSYNC_TOTAL_SIZE = re.compile(r"^Total file size: ([\d,]+) bytes")
+
 
 def _sanitize_db_output(text, password):
     """Strip the literal password and password-related warnings from
@@ -28,15 +39,110 @@ def _sanitize_db_output(text, password):
     ]
     return "\n".join(cleaned_lines).strip()
 
+
+def _option_file_value(value):
+    """Quote value for a MySQL option file ([client] section of a --defaults-file).
+
+    Unquoted values lose leading/trailing whitespace and are cut at '#'.
+    """
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"')
+               .replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t'))
+    return f'"{escaped}"'
+
+
+def copy_file(src, dst, mode=0o666, fsync=False):
+    """Copy src to dst with os.copy_file_range, so the data never passes through
+    userspace (and can be reflinked on filesystems that support it). Falls back
+    to os.sendfile if the syscall is unavailable or refused, and to a chunked
+    copy if that fails too; the file is never read into memory as a whole.
+
+    mode only applies when dst is created and is subject to the umask. fsync
+    flushes dst to disk before returning."""
+    with open(src, 'rb') as fsrc, open(os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        try:
+            remaining = size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except (AttributeError, OSError):
+            # Old kernel/Python, or a cross-filesystem copy the kernel refuses.
+            fdst.seek(0)
+            fdst.truncate()
+            try:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except (AttributeError, OSError):
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                shutil.copyfileobj(fsrc, fdst)
+        if fsync:
+            fdst.flush()
+            os.fsync(fdst.fileno())
+
+
+def _git_cmd(repo_path, *args):
+    """Return the command line for running git with args in repo_path.
+
+    The checkout is chowned to the web server user, and git refuses to work in a
+    repository owned by another user ("detected dubious ownership") unless it is
+    listed in safe.directory. Marking it safe on the command line covers this
+    one call (and its submodule operations) without touching any git config.
+    """
+    return ['git', '-c', f'safe.directory={repo_path}', '-C', repo_path, *args]
+
+
+def _chown_tree(path, user, group):
+    """Recursively chown path to user:group in-process instead of forking `chown -R`.
+
+    The user and group are resolved once; symlinks are changed themselves and
+    never followed. Raises KeyError for an unknown user/group and OSError if a
+    chown fails."""
+    uid = pwd.getpwnam(user).pw_uid
+    gid = grp.getgrnam(group).gr_gid
+    os.chown(path, uid, gid, follow_symlinks=False)
+    for _, dirnames, filenames, dirfd in os.fwalk(path):
+        for name in dirnames + filenames:
+            os.chown(name, uid, gid, dir_fd=dirfd, follow_symlinks=False)
+
+
+def _drop_page_cache(fd):
+    """Tell the kernel the file behind fd won't be read again on this host, so
+    its pages can be evicted instead of pushing out the live Moodle/MySQL
+    working set. Best effort: not every platform has posix_fadvise.
+
+    DONTNEED skips dirty pages, so the file's data is written out first;
+    for a file that was just written this is what makes the call effective."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError as e:
+        logging.debug("posix_fadvise(DONTNEED) failed: %s", e)
+
 class MoodleBackupManager:
     """Manages directory backups, database dumps, and Git clone operations for Moodle."""
 
-    def __init__(self, path, moodle, folder_backup_path, dry_run=False):
+    def __init__(self, path, moodle, folder_backup_path, dry_run=False, shallow_clone=True, submodule_jobs=None):
         self.path = path
         self.moodle = moodle
         self.folder_backup_path = folder_backup_path
+        # Fetch only the branch tip instead of the full Moodle history
+        self.shallow_clone = shallow_clone
+        # Number of submodules fetched at the same time (default: one per CPU)
+        self.submodule_jobs = submodule_jobs or os.cpu_count() or 4
         self.dry_run = dry_run
         self.runtime_backup = None
+        # Directory backup written by this run, used by the restore steps
+        self.last_backup_folder = None
         self.runtime_dump = None
         self.runtime_clone = None
         self.runtime_cliupgrade = None
@@ -72,50 +178,181 @@ class MoodleBackupManager:
     # are not Moodle plugins.
     PLUGIN_WALK_SKIP_DIRS = {'.git', 'node_modules', 'vendor'}
 
-    def dir_backup(self, full_backup):
-        """Handle directory backups using rsync."""
+    # Database dump compressors: command reading SQL on stdin and writing to
+    # stdout, file suffix, and the rough compressed/plain size ratio used for the
+    # progress estimate. zstd's long-range matching (128 MiB window) finds the
+    # repeated INSERT prefixes of big tables; a window of that size still
+    # decompresses with a plain `zstd -d`.
+    DUMP_COMPRESSORS = {
+        'gzip': (['gzip', '-c'], '.gz', 0.2),
+        'zstd': (['zstd', '-q', '-T0', '-3', '--long=27', '-c'], '.zst', 0.15),
+    }
+
+    def dir_backup(self, full_backup, timestamp=None):
+        """Handle directory backups using rsync.
+
+        timestamp names the backup folder; main() passes one shared by all phases
+        of a run so the backup and the database dump carry the same suffix.
+        """
         start = time.time()
+        timestamp = timestamp or time.strftime('%Y-%m-%d-%H-%M-%S')
 
         backup_type = "full" if full_backup else "partial"
         source_path = os.path.join(self.path, '') if full_backup else os.path.join(self.path, self.moodle, '')
         backup_folder = os.path.join(
             self.folder_backup_path,
-            f"{self.moodle}_bak_{backup_type}_{time.strftime('%Y-%m-%d-%H-%M-%S')}"
+            f"{self.moodle}_bak_{backup_type}_{timestamp}"
         )
 
+        # rsync never descends into an excluded directory. The patterns are anchored
+        # to the transfer root ("/...") and restricted to directories (trailing "/"),
+        # so only those top-level directories are excluded and not same-named
+        # directories deeper in the tree.
         exclude_args = [
-            '--exclude', 'moodledata/cache',
-            '--exclude', 'moodledata/localcache',
-            '--exclude', 'moodledata/sessions',
-            '--exclude', 'moodledata/temp',
-            '--exclude', 'moodledata/trashdir',
+            '--exclude', '/moodledata/cache/',
+            '--exclude', '/moodledata/localcache/',
+            '--exclude', '/moodledata/sessions/',
+            '--exclude', '/moodledata/temp/',
+            '--exclude', '/moodledata/trashdir/',
+            # Files Moodle is still writing into the file pool (renamed once
+            # complete) and pid files, which are meaningless in a backup
+            '--exclude', '/moodledata/filedir/**.tmp',
+            '--exclude', '*.pid',
+            # Trees next to the Moodle checkout that change while the backup runs:
+            # the staging clone of dir_backup_and_git_clone and replaced trees
+            # that _remove_tree is deleting in the background (including a leftover
+            # staging clone from an interrupted run, renamed to <moodle>.new.old-*)
+            '--exclude', f'/{self.moodle}.new/',
+            '--exclude', f'/{self.moodle}.old-*/',
+            '--exclude', f'/{self.moodle}.new.old-*/',
         ] if full_backup else []
 
-        logging.info(f"Starting {backup_type} backup from {source_path} to {backup_folder}")
+        # -a keeps permissions, ownership, timestamps and symlinks so the backup can
+        # be restored as-is (-r silently skipped symlinks); -H keeps hard links and
+        # --numeric-ids keeps ownership independent of the local user database.
+        # The target folder is always new, so --inplace writes each file directly
+        # instead of going through a temporary file and a rename, and
+        # --preallocate reserves each file's full size up front to keep it
+        # unfragmented. (Local copies never use rsync's delta algorithm.)
+        # progress2/stats2 report overall progress and the backup size on stdout,
+        # which is streamed into the log while rsync runs.
+        rsync_args = ['rsync', '-aH', '--numeric-ids', '--inplace', '--preallocate', '--info=progress2,stats2']
+
+        # Files unchanged since the previous backup of the same type are hard-linked
+        # to it instead of being copied again, so only the delta costs time and space.
+        previous_backup = self._previous_backup(backup_type, backup_folder)
+        if previous_backup:
+            logging.info("Hard-linking unchanged files against previous backup %s", previous_backup)
+            rsync_args.append(f"--link-dest={previous_backup}")
+
+        rsync_args += [*exclude_args, source_path, backup_folder]
+
+        # The backup is not read again soon; nocache (if installed) keeps rsync
+        # from evicting the live site's and database's pages from the page cache.
+        if shutil.which('nocache'):
+            rsync_args.insert(0, 'nocache')
+
+        logging.info("Starting %s backup from %s to %s", backup_type, source_path, backup_folder)
 
         if self.dry_run:
-            logging.info(f"[Dry Run] Would run: rsync {' '.join(exclude_args)} {source_path} {backup_folder}")
+            logging.info("[Dry Run] Would run: %s", ' '.join(rsync_args))
         else:
             try:
-                subprocess.run(['rsync', '-r', *exclude_args, source_path, backup_folder], check=True)
-                size = sum(
-                    os.path.getsize(os.path.join(root, file))
-                    for root, _, files in os.walk(backup_folder)
-                    for file in files
-                )
-                logging.info(f"Backup completed and saved in {backup_folder} - ({size / (1024 * 1024 * 1024):.2f} GB)")
+                size = self._run_rsync(rsync_args)
+                self.last_backup_folder = backup_folder
+                size_info = f" - ({size / (1024 * 1024 * 1024):.2f} GB)" if size is not None else ""
+                logging.info("Backup completed and saved in %s%s", backup_folder, size_info)
             except subprocess.CalledProcessError as e:
-                logging.error(f"Backup failed: {e.stderr}")
+                logging.error("Backup failed: rsync exited with status %s", e.returncode)
 
         self.runtime_backup = int(time.time() - start)
 
-    def db_dump(self, dbname, dbuser, dbpass, verbose, db_dump_path):
-        """Perform database dump using mysqldump with progress monitoring."""
+    @staticmethod
+    def _run_rsync(rsync_args, log_interval=60):
+        """Run rsync and stream its output into the log.
+
+        Progress lines are logged at most every log_interval seconds; everything
+        else (stats, warnings, errors) is logged as it arrives. Returns the total
+        file size from the stats, or None if rsync did not report it; raises
+        CalledProcessError if rsync fails.
+        """
+        total_size = None
+        last_progress_log = float("-inf")  # log the first progress line right away
+        # stderr is merged into stdout so errors show up in order with the progress.
+        # progress2 ends its updates with \r, which text mode turns into line breaks.
+        # File names need not be valid UTF-8 (moodledata often has some), so decode leniently.
+        with subprocess.Popen(rsync_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors='replace', bufsize=1) as process:
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                if RSYNC_PROGRESS.match(line):
+                    now = time.monotonic()
+                    if now - last_progress_log >= log_interval:
+                        last_progress_log = now
+                        logging.info("Backup progress: %s", line)
+                    continue
+                match = RSYNC_TOTAL_SIZE.match(line)
+                if match:
+                    total_size = int(match.group(1).replace(',', ''))
+                logging.info("rsync: %s", line)
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, rsync_args)
+        return total_size
+
+    def _latest_backup(self, full_backup):
+        """Return the backup folder to restore from: the one written by this run, else the newest one on disk."""
+        if self.last_backup_folder:
+            return self.last_backup_folder
+        return self._previous_backup("full" if full_backup else "partial", None)
+
+    def _previous_backup(self, backup_type, backup_folder):
+        """Return the newest existing backup folder of backup_type other than backup_folder, or None."""
+        pattern = os.path.join(self.folder_backup_path, f"{self.moodle}_bak_{backup_type}_*")
+        # The timestamp suffix sorts chronologically.
+        backups = sorted(
+            path for path in glob.glob(pattern)
+            if os.path.isdir(path) and path != backup_folder
+        )
+        return backups[-1] if backups else None
+
+    def db_dump(self, dbname, dbuser, dbpass, verbose, db_dump_path, timestamp=None, compression="none", net_buffer_length=None, db_size_mb=None, dump_tool="mysqldump", dump_threads=None):
+        """Perform database dump using mysqldump with progress monitoring.
+
+        compression "gzip" or "zstd" streams the dump through that compressor
+        while it is written; "none" writes plain SQL. net_buffer_length sets
+        mysqldump's communication buffer (and multi-row INSERT size) in bytes.
+        db_size_mb is the database size if already known; otherwise the progress
+        monitor queries it. dump_tool "mydumper" dumps the tables in parallel
+        with dump_threads threads instead, if mydumper is installed.
+        """
         start = time.time()
+        timestamp = timestamp or time.strftime('%Y-%m-%d-%H-%M-%S')
+
+        if dump_tool == "mydumper":
+            if shutil.which("mydumper"):
+                if self._mydumper_dump(dbname, dbuser, dbpass, verbose, db_dump_path, timestamp, compression, db_size_mb, dump_threads):
+                    self.runtime_dump = int(time.time() - start)
+                return
+            logging.warning("mydumper is not installed. Falling back to mysqldump.")
+        elif dump_tool not in ("mysqldump", ""):
+            logging.warning("Unknown dump tool '%s'. Using mysqldump.", dump_tool)
+
+        compressor = self.DUMP_COMPRESSORS.get(compression)
+        if compression not in ("none", "") and compressor is None:
+            logging.warning("Unknown dump compression '%s'. Writing an uncompressed dump.", compression)
+        elif compression == "gzip" and shutil.which("pigz"):
+            # pigz writes the same gzip format using all cores; gzip uses one.
+            compressor = (['pigz', '-c'], *compressor[1:])
+        elif compressor and not shutil.which(compressor[0][0]):
+            logging.warning("%s is not installed. Writing an uncompressed dump.", compressor[0][0])
+            compressor = None
+        compress_cmd, suffix, size_ratio = compressor or (None, "", 1.0)
 
         dump_file = os.path.join(
             db_dump_path,
-            f"{dbname}_{time.strftime('%Y-%m-%d-%H-%M-%S')}.sql"
+            f"{dbname}_{timestamp}.sql{suffix}"
         )
         # Pass the DB password via the MYSQL_PWD environment variable rather
         # than as a -p<pw> CLI argument: CLI args are visible in `ps` output
@@ -127,33 +364,38 @@ class MoodleBackupManager:
         ]
         dump_env = {**os.environ, 'MYSQL_PWD': dbpass}
 
+        if net_buffer_length:
+            dump_args.append(f'--net_buffer_length={net_buffer_length}')
+
         if verbose:
             dump_args.append('--verbose')
 
-        logging.info(f"Starting database dump for {dbname} to {dump_file}")
+        logging.info("Starting database dump for %s to %s", dbname, dump_file)
 
         # Initialize SystemMonitor
         monitor = SystemMonitor()
 
         # Start monitoring during database dump
-        monitor.start_monitoring(dump_file, dbname, dbuser, dbpass)
+        monitor.start_monitoring(dump_file, dbname, dbuser, dbpass, size_ratio, db_size_mb)
 
         try:
             if self.dry_run:
-                logging.info(f"[Dry Run] Would run: {' '.join(dump_args)} (with MYSQL_PWD set)")
+                pipeline = f" | {' '.join(compress_cmd)}" if compress_cmd else ""
+                logging.info("[Dry Run] Would run: %s%s (with MYSQL_PWD set)", ' '.join(dump_args), pipeline)
                 time.sleep(10)
             else:
-                with open(dump_file, "w") as dump:
-                    result = subprocess.run(dump_args, stdout=dump, stderr=subprocess.PIPE, text=True, check=True, env=dump_env)
-                    sanitized_stderr = _sanitize_db_output(result.stderr, dbpass)
+                with open(dump_file, "wb") as dump:
+                    dump_stderr = self._run_dump(dump_args, dump_env, dump, compress_cmd)
+                    _drop_page_cache(dump.fileno())
+                    sanitized_stderr = _sanitize_db_output(dump_stderr, dbpass)
                     if sanitized_stderr:
-                        logging.warning(f"mysqldump warning: {sanitized_stderr}")
-                    logging.info(f"Database dump saved in {dump_file} - ({os.path.getsize(dump_file) / (1024 * 1024 * 1024):.2f} GB)")
+                        logging.warning("mysqldump warning: %s", sanitized_stderr)
+                    logging.info("Database dump saved in %s - (%.2f GB)", dump_file, os.path.getsize(dump_file) / (1024 * 1024 * 1024))
         except (IOError, OSError) as file_error:
-            logging.error(f"Failed to open {dump_file} for writing: {file_error}")
+            logging.error("Failed to open %s for writing: %s", dump_file, file_error)
             return
         except subprocess.CalledProcessError as e:
-            logging.error(f"Database dump failed: {_sanitize_db_output(e.stderr, dbpass)}")
+            logging.error("Database dump failed: %s", _sanitize_db_output(e.stderr, dbpass))
             return
         finally:
             # Stop monitoring
@@ -161,110 +403,384 @@ class MoodleBackupManager:
 
         self.runtime_dump = int(time.time() - start)
 
-    def git_clone(self, config_php, repository, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup=False, full_backup=False):
-        """Clone a git repository."""
+    def _mydumper_dump(self, dbname, dbuser, dbpass, verbose, db_dump_path, timestamp, compression, db_size_mb, threads=None):
+        """Dump the database with mydumper into a directory, one file per table (chunk).
+
+        Returns True if the dump succeeded.
+        """
+        dump_dir = os.path.join(db_dump_path, f"{dbname}_{timestamp}")
+        threads = threads or os.cpu_count() or 4
+        compress = compression not in ("none", "")
+        size_ratio = 0.2 if compress else 1.0
+
+        logging.info("Starting database dump for %s to %s with mydumper (%s threads)", dbname, dump_dir, threads)
+
+        monitor = SystemMonitor()
+        # The monitor sums up the size of the files in dump_dir.
+        monitor.start_monitoring(dump_dir, dbname, dbuser, dbpass, size_ratio, db_size_mb)
+        try:
+            # The credentials go into a private option file rather than onto
+            # the command line, where they would be visible in `ps` output.
+            with tempfile.NamedTemporaryFile('w', prefix='mydumper-', suffix='.cnf') as defaults_file:
+                os.fchmod(defaults_file.fileno(), 0o600)
+                defaults_file.write(f"[client]\nuser={_option_file_value(dbuser)}\npassword={_option_file_value(dbpass)}\n")
+                defaults_file.flush()
+
+                dump_args = [
+                    'mydumper', f'--defaults-file={defaults_file.name}',
+                    '--database', dbname, '--outputdir', dump_dir,
+                    '--threads', str(threads),
+                    # Split big tables into chunks so they are dumped in parallel too
+                    '--rows', '50000',
+                    # InnoDB only: a consistent snapshot without holding FTWRL for the whole dump
+                    '--trx-consistency-only',
+                ]
+                if compress:
+                    dump_args.append('--compress')
+                if verbose:
+                    dump_args += ['--verbose', '3']
+
+                if self.dry_run:
+                    logging.info("[Dry Run] Would run: %s", ' '.join(dump_args))
+                    time.sleep(10)
+                    return True
+                result = subprocess.run(dump_args, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            logging.error("Database dump failed: %s", _sanitize_db_output(e.stderr, dbpass))
+            return False
+        except OSError as e:
+            logging.error("Database dump with mydumper failed: %s", e)
+            return False
+        finally:
+            monitor.stop_monitoring()
+
+        output = _sanitize_db_output(result.stderr, dbpass)
+        if output:
+            logging.warning("mydumper output: %s", output)
+        size = SystemMonitor.path_size(dump_dir)
+        logging.info("Database dump saved in %s - (%.2f GB)", dump_dir, size / (1024 * 1024 * 1024))
+        return True
+
+    @staticmethod
+    def _run_dump(dump_args, dump_env, dump, compress_cmd=None):
+        """Run mysqldump into the open file dump, piped through compress_cmd if given.
+
+        Returns mysqldump's stderr; raises CalledProcessError if mysqldump or
+        the compressor fails.
+        """
+        if not compress_cmd:
+            result = subprocess.run(dump_args, stdout=dump, stderr=subprocess.PIPE, text=True, check=True, env=dump_env)
+            return result.stderr
+
+        # mysqldump's stderr goes to a temp file: with --verbose it can fill a pipe
+        # while we are blocked waiting on the compressor, deadlocking both.
+        with tempfile.TemporaryFile() as dump_stderr:
+            dump_proc = subprocess.Popen(dump_args, stdout=subprocess.PIPE, stderr=dump_stderr, env=dump_env)
+            # A 1 MiB pipe instead of the default 64 KiB lets mysqldump and the
+            # compressor move data in larger blocks with fewer context switches.
+            try:
+                fcntl.fcntl(dump_proc.stdout.fileno(), getattr(fcntl, 'F_SETPIPE_SZ', 1031), 1 << 20)
+            except OSError:
+                pass  # above /proc/sys/fs/pipe-max-size; keep the default
+            compress_proc = subprocess.Popen(compress_cmd, stdin=dump_proc.stdout, stdout=dump, stderr=subprocess.PIPE)
+            # The compressor owns the read end now; closing ours lets mysqldump
+            # get SIGPIPE if the compressor dies.
+            dump_proc.stdout.close()
+            _, compress_stderr = compress_proc.communicate()
+            dump_proc.wait()
+            dump_stderr.seek(0)
+            stderr = dump_stderr.read().decode(errors='replace')
+
+        if dump_proc.returncode != 0:
+            raise subprocess.CalledProcessError(dump_proc.returncode, dump_args, stderr=stderr)
+        if compress_proc.returncode != 0:
+            raise subprocess.CalledProcessError(compress_proc.returncode, compress_cmd, stderr=compress_stderr.decode(errors='replace'))
+        return stderr
+
+    def git_clone(self, config_php_path, repository, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup=False, full_backup=False, config_php_mode=None):
+        """Clone a git repository.
+
+        config_php_mode is the mode of the original config.php when config_php_path
+        is a snapshot of it; see _finish_clone.
+        """
         start = time.time()
         clone_path = os.path.join(self.path, self.moodle)
 
-        if os.path.exists(clone_path):
-            if self.dry_run:
-                logging.info(f"[Dry Run] Would remove existing directory: {clone_path}")
-            else:
-                try:
-                    shutil.rmtree(clone_path)
-                except PermissionError:
-                    logging.error(f"Permission denied while removing {clone_path}. Try running with elevated privileges.")
-                except Exception as e:
-                    logging.error(f"Error removing directory {clone_path}: {e}")
+        # Reuse the existing checkout when it already tracks the same repository;
+        # only fall back to remove + clone when that is not possible.
+        updated_in_place = self._update_existing_clone(clone_path, repository, branch)
+        if not updated_in_place:
+            self._remove_tree(clone_path)
+            self._clone_fresh(clone_path, repository, branch)
+
+        self._finish_clone(clone_path, config_php_path, sync_submodules, chown_user, chown_group, restore_submodules_from_backup, full_backup, updated_in_place, config_php_mode)
+
+        logging.info("Finished git clone process")
+        self.runtime_clone = int(time.time() - start)
+        logging.info("Git clone completed in %s seconds.", self.runtime_clone)
+
+    def _remove_tree(self, path):
+        """Remove a directory tree if it exists.
+
+        The tree is renamed to <path>.old-<timestamp>, which is instant, so the
+        caller can put a new tree in its place right away. The old tree is then
+        deleted by a separate `rm -rf` (at idle I/O priority if ionice is
+        available), which unlinks faster than shutil.rmtree and keeps running
+        in its own session even after this script has exited.
+        """
+        if self.dry_run:
+            if os.path.exists(path):
+                logging.info("[Dry Run] Would remove existing directory: %s", path)
+            return
+        old_path = f"{path}.old-{int(time.time())}"
+        try:
+            os.rename(path, old_path)
+        except FileNotFoundError:
+            return  # nothing to remove
+        except OSError as e:
+            # e.g. path is a mount point; remove it in place instead
+            logging.debug("Renaming %s failed (%s), removing it in place.", path, e)
+            self._rmtree(path)
+            return
+        logging.info("Moved %s to %s, removing it in the background.", path, old_path)
+        rm_args = ['rm', '-rf', '--', old_path]
+        # Idle I/O class: the deletion only gets the disk when the clone and
+        # backup running alongside it don't need it.
+        if shutil.which('ionice'):
+            rm_args = ['ionice', '-c3'] + rm_args
+        subprocess.Popen(rm_args, start_new_session=True)
+
+    @staticmethod
+    def _rmtree(path):
+        """shutil.rmtree that logs failures instead of raising."""
+        try:
+            shutil.rmtree(path)
+        except PermissionError:
+            logging.error("Permission denied while removing %s. Try running with elevated privileges.", path)
+        except Exception as e:
+            logging.error("Error removing directory %s: %s", path, e)
 
+    def _clone_fresh(self, clone_path, repository, branch):
+        """Clone repository into clone_path (which must not exist) and check out branch."""
         if self.dry_run:
-            logging.info(f"[Dry Run] Would clone repository: {repository} to {self.path}")
-            logging.info(f"[Dry Run] Would checkout branch: {branch} to {clone_path}")
+            logging.info("[Dry Run] Would clone repository: %s to %s%s", repository, clone_path, ' (shallow)' if self.shallow_clone else '')
+            logging.info("[Dry Run] Would checkout branch: %s to %s", branch, clone_path)
+        elif self.shallow_clone:
+            # Only the tip of the branch is needed to deploy; --branch also
+            # replaces the separate checkout.
+            try:
+                subprocess.run(['git', 'clone', '--depth', '1', '--single-branch', '--branch', branch, repository, clone_path], check=True)
+            except subprocess.CalledProcessError as e:
+                logging.error("Git clone failed: %s", e.stderr)
         else:
+            # Full history, but file contents (blobs) are only downloaded for the
+            # checked-out tree; older ones are fetched on demand if ever needed.
             try:
-                subprocess.run(['git', 'clone', repository, clone_path], check=True)
+                subprocess.run(['git', 'clone', '--filter=blob:none', repository, clone_path], check=True)
             except subprocess.CalledProcessError as e:
-                logging.error(f"Git clone failed: {e.stderr}")
+                logging.error("Git clone failed: %s", e.stderr)
             try:
                 subprocess.run(['git', '-C', clone_path, 'checkout', branch], check=True)
             except subprocess.CalledProcessError as e:
-                logging.error(f"Git checkout failed: {e.stderr}")
+                logging.error("Git checkout failed: %s", e.stderr)
+
+    def _finish_clone(self, clone_path, config_php_path, sync_submodules, chown_user, chown_group, restore_submodules_from_backup=False, full_backup=False, updated_in_place=False, config_php_mode=None):
+        """Populate submodules, restore config.php and set ownership of a fresh checkout.
 
+        updated_in_place tells whether clone_path is an existing checkout that was
+        updated rather than a new clone. config_php_mode is the mode to give the
+        restored config.php (without world access); defaults to that of config_php_path.
+        """
         if sync_submodules:
             if self.dry_run:
-                logging.info(f"[Dry Run] Would sync and update git submodules in {clone_path}")
+                logging.info("[Dry Run] Would sync and update git submodules in %s", clone_path)
             else:
-                try:
-                    subprocess.run(['git', 'submodule', 'sync'], cwd=clone_path, check=True)
-                except subprocess.CalledProcessError as e:
-                    logging.error(f"Git submodule sync failed: {e.stderr}")
-                
-                # Get list of submodules and update each individually
-                result = subprocess.run(['git', 'submodule', 'status'], cwd=clone_path, capture_output=True, text=True)
-                
-                for line in result.stdout.strip().split('\n'):
-                    if not line.strip():
-                        continue
-                    submodule_path = line.split()[1]
+                # sync only rewrites submodule URLs that are already registered in
+                # .git/config; a new clone has none, so init below is enough there.
+                if updated_in_place:
                     try:
-                        subprocess.run(['git', 'submodule', 'update', '--init', '--recursive', '--remote', '--', submodule_path], 
-                                      cwd=clone_path, check=True)
-                        logging.info(f"Updated submodule {submodule_path} with remote tracking branch")
-                        self.submodules_success += 1
+                        subprocess.run(_git_cmd(clone_path, 'submodule', 'sync'), check=True)
                     except subprocess.CalledProcessError as e:
-                        logging.error(f"Git submodule update failed for {submodule_path}: {e.stderr}")
-                        self.submodules_failed += 1
-                        self.failed_submodules.append(submodule_path)
-                
+                        logging.error("Git submodule sync failed: %s", e.stderr)
+
+                # Get list of submodules and update each individually
+                result = subprocess.run(_git_cmd(clone_path, 'submodule', 'status'), capture_output=True, text=True)
+                submodule_paths = [line.split()[1] for line in result.stdout.strip().split('\n') if line.strip()]
+
+                # Register all submodules in .git/config up front, so the parallel
+                # updates below never compete for the superproject's config lock.
+                try:
+                    subprocess.run(_git_cmd(clone_path, 'submodule', 'init'), check=True)
+                except subprocess.CalledProcessError as e:
+                    logging.error("Git submodule init failed: %s", e.stderr)
+
+                # Each submodule is its own network fetch, so update them concurrently.
+                # Results are counted here, in the calling thread.
+                with ThreadPoolExecutor(max_workers=self.submodule_jobs) as executor:
+                    futures = {executor.submit(self._update_submodule, clone_path, submodule_path, self.shallow_clone): submodule_path
+                               for submodule_path in submodule_paths}
+                    for future in as_completed(futures):
+                        if future.result():
+                            self.submodules_success += 1
+                        else:
+                            self.submodules_failed += 1
+                            self.failed_submodules.append(futures[future])
+                # Completion order varies from run to run; report failures by path.
+                self.failed_submodules.sort()
+
                 # Log brief summary
                 total = self.submodules_success + self.submodules_failed
                 if total > 0:
-                    logging.info(f"Submodule sync complete: {self.submodules_success}/{total} succeeded, {self.submodules_failed}/{total} failed")
+                    logging.info("Submodule sync complete: %s/%s succeeded, %s/%s failed", self.submodules_success, total, self.submodules_failed, total)
         elif restore_submodules_from_backup:
-            if not full_backup:
-                backup_folder = max(glob.glob(os.path.join(self.folder_backup_path, f"{self.moodle}_bak_partial_*")), key=os.path.getmtime)
-            else:
-                backup_folder = max(glob.glob(os.path.join(self.folder_backup_path, f"{self.moodle}_bak_full_*"), "moodle"), key=os.path.getmtime)
-
-            submodules = subprocess.run(['git', 'config', '--file', os.path.join(backup_folder, '.gitmodules'), '--get-regexp', 'path'], capture_output=True, text=True)
-            if submodules.returncode == 0:
-                submodule_paths = [line.split()[1] for line in submodules.stdout.strip().split('\n')]
+            backup_folder = self._latest_backup(full_backup)
+            if backup_folder and full_backup:
+                # In a full backup the moodle source lives under <backup>/<moodle>/.
+                backup_folder = os.path.join(backup_folder, self.moodle)
+
+            submodule_paths = []
+            if not backup_folder:
+                logging.error("No directory backup found; cannot restore submodules.")
             else:
-                logging.error(f"Failed to get submodules from backup: {submodules.stderr.strip()}")
-                submodule_paths = []
+                submodules = subprocess.run(['git', 'config', '--file', os.path.join(backup_folder, '.gitmodules'), '--get-regexp', 'path'], capture_output=True, text=True)
+                if submodules.returncode == 0:
+                    submodule_paths = [line.split()[1] for line in submodules.stdout.strip().split('\n')]
+                else:
+                    logging.error("Failed to get submodules from backup: %s", submodules.stderr.strip())
 
             if self.dry_run:
-                logging.info(f"[Dry Run] Would restore submodules {submodule_paths} from backup in {backup_folder} to {clone_path}")
+                logging.info("[Dry Run] Would restore submodules %s from backup in %s to %s", submodule_paths, backup_folder, clone_path)
                 for submodule in submodule_paths:
-                        logging.info(f"[Dry Run] would restore submodule {submodule} from backup {backup_folder} to {clone_path}")
+                        logging.info("[Dry Run] would restore submodule %s from backup %s to %s", submodule, backup_folder, clone_path)
             else:
                 try:
                     for submodule in submodule_paths:
-                        logging.info(f"Restoring submodule {submodule} from backup {backup_folder} to {clone_path}")
+                        logging.info("Restoring submodule %s from backup %s to %s", submodule, backup_folder, clone_path)
                         subprocess.run(['cp', '-r', os.path.join(backup_folder, submodule), os.path.join(clone_path, os.path.dirname(submodule))], check=True)
                 except subprocess.CalledProcessError as e:
-                    logging.error(f"Restoring submodules from backup failed: {e.stderr}")
+                    logging.error("Restoring submodules from backup failed: %s", e.stderr)
 
         if self.dry_run:
-            logging.info(f"[Dry Run] Would create config.php in {clone_path}")
-            logging.info(f"[Dry Run] Would set ownership of {clone_path} to www-data:www-data.")
+            if config_php_path:
+                logging.info("[Dry Run] Would copy config.php from %s to %s", config_php_path, clone_path)
+            logging.info("[Dry Run] Would set ownership of %s to %s:%s.", clone_path, chown_user, chown_group)
         else:
-            with open(os.path.join(clone_path, 'config.php'), 'w') as config_file:
-                config_file.write(config_php)
+            if config_php_path:
+                config_php_dst = os.path.join(clone_path, 'config.php')
+                # config.php holds the DB credentials: create it without world
+                # access and make it durable before the ownership walk below.
+                copy_file(config_php_path, config_php_dst, mode=0o640, fsync=True)
+                # Keep the original owner/group permissions but never world access,
+                # also when config.php already existed and the create mode did not apply.
+                # config_php_path is usually an owner-only snapshot, so its own mode
+                # says nothing about the original.
+                if config_php_mode is None:
+                    config_php_mode = os.stat(config_php_path).st_mode
+                os.chmod(config_php_dst, config_php_mode & 0o770)
             try:
-                subprocess.run(['chown', f'{chown_user}:{chown_group}', clone_path, '-R'], check=True)
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Setting folder ownership failed: {e.stderr}")
+                _chown_tree(clone_path, chown_user, chown_group)
+            except (KeyError, OSError) as e:
+                logging.error("Setting folder ownership failed: %s", e)
 
-        logging.info("Finished git clone process")
-        self.runtime_clone = int(time.time() - start)
-        logging.info(f"Git clone completed in {self.runtime_clone} seconds.")
+    @staticmethod
+    def _update_submodule(clone_path, submodule_path, shallow=False):
+        """Update a single submodule to its remote tracking branch. Returns True on success.
 
-    def dir_backup_and_git_clone(self, config_php, full_backup, repo, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup=False):
-        """Perform directory backup followed by git clone."""
+        shallow fetches only the tip of that branch instead of its full history.
+        """
+        depth_args = ['--depth', '1'] if shallow else []
+        try:
+            subprocess.run(_git_cmd(clone_path, 'submodule', 'update', '--init', '--recursive', '--remote', *depth_args, '--', submodule_path),
+                           check=True)
+            logging.info("Updated submodule %s with remote tracking branch", submodule_path)
+            return True
+        except subprocess.CalledProcessError as e:
+            logging.error("Git submodule update failed for %s: %s", submodule_path, e.stderr)
+            return False
+
+    @staticmethod
+    def _is_checkout_of(clone_path, repository):
+        """Return True if clone_path is a git checkout whose origin is repository."""
+        if not os.path.isdir(os.path.join(clone_path, '.git')):
+            return False
+
+        origin = subprocess.run(_git_cmd(clone_path, 'remote', 'get-url', 'origin'), capture_output=True, text=True)
+        if origin.returncode != 0:
+            logging.warning("Could not read the origin of the existing checkout in %s: %s. Cloning from scratch.", clone_path, origin.stderr.strip())
+            return False
+        if origin.stdout.strip() != repository:
+            logging.info("Existing checkout in %s does not track %s. Cloning from scratch.", clone_path, repository)
+            return False
+        return True
+
+    def _update_existing_clone(self, clone_path, repository, branch):
+        """Bring an existing checkout at clone_path to the tip of origin/<branch>.
+
+        Fetching only the new tip and resetting the working tree avoids deleting
+        and re-downloading the whole Moodle repository on every run. Returns False
+        when the caller has to fall back to a fresh clone: no repository there,
+        a different origin, or one of the git commands failed.
+        """
+        if not self._is_checkout_of(clone_path, repository):
+            return False
+
+        if self.dry_run:
+            logging.info("[Dry Run] Would fetch %s from %s and reset %s to it", branch, repository, clone_path)
+            return True
+
+        logging.info("Updating existing checkout in %s to origin/%s", clone_path, branch)
+        try:
+            depth_args = ['--depth', '1'] if self.shallow_clone else []
+            subprocess.run(_git_cmd(clone_path, 'fetch', *depth_args, 'origin',
+                                    f'+refs/heads/{branch}:refs/remotes/origin/{branch}'), check=True)
+            subprocess.run(_git_cmd(clone_path, 'checkout', '--force', '-B', branch, f'origin/{branch}'), check=True)
+            # -ff also removes untracked nested repositories, -x the ignored files (config.php etc.),
+            # so the tree ends up equivalent to a fresh clone.
+            subprocess.run(_git_cmd(clone_path, 'clean', '-ffdx'), check=True)
+        except subprocess.CalledProcessError as e:
+            logging.warning("Updating existing checkout failed (%s). Falling back to a fresh clone.", e)
+            return False
+        return True
+
+    def dir_backup_and_git_clone(self, config_php_path, full_backup, repo, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup=False, timestamp=None, config_php_mode=None):
+        """Perform directory backup and git clone.
+
+        An existing checkout of repo is updated in place, which only fetches the
+        new commits but modifies the tree the backup reads, so the clone waits for
+        the backup. Otherwise the fresh clone goes into a staging directory while
+        the backup runs and is swapped in once the backup has finished.
+        """
         logging.info("Starting directory backup and git clone process.")
-        self.dir_backup(full_backup)
-        self.git_clone(config_php, repo, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup, full_backup)
+        clone_path = os.path.join(self.path, self.moodle)
+
+        if self._is_checkout_of(clone_path, repo):
+            self.dir_backup(full_backup, timestamp)
+            self.git_clone(config_php_path, repo, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup, full_backup, config_php_mode)
+            return
+
+        staging_path = f"{clone_path}.new"
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            backup = executor.submit(self.dir_backup, full_backup, timestamp)
+            start = time.time()
+            self._remove_tree(staging_path)  # leftover from an interrupted run
+            self._clone_fresh(staging_path, repo, branch)
+            backup.result()
+
+        if self.dry_run:
+            logging.info("[Dry Run] Would replace %s with %s", clone_path, staging_path)
+        elif not os.path.isdir(os.path.join(staging_path, '.git')):
+            logging.error("Git clone into %s failed. Keeping the existing %s.", staging_path, clone_path)
+            self.runtime_clone = int(time.time() - start)
+            return
+        else:
+            self._remove_tree(clone_path)
+            os.rename(staging_path, clone_path)
+
+        self._finish_clone(clone_path, config_php_path, sync_submodules, chown_user, chown_group, restore_submodules_from_backup, full_backup, config_php_mode=config_php_mode)
+
+        logging.info("Finished git clone process")
+        self.runtime_clone = int(time.time() - start)
+        logging.info("Git clone completed in %s seconds.", self.runtime_clone)
 
     def _find_code_root(self, moodle_root):
         """Return the dir holding Moodle's code tree.
@@ -294,15 +810,10 @@ class MoodleBackupManager:
         clone_path = os.path.join(self.path, self.moodle)
 
         # Locate the latest directory backup (mirrors restore-submodules logic).
-        if not full_backup:
-            pattern = os.path.join(self.folder_backup_path, f"{self.moodle}_bak_partial_*")
-        else:
-            pattern = os.path.join(self.folder_backup_path, f"{self.moodle}_bak_full_*")
-        candidates = glob.glob(pattern)
-        if not candidates:
-            logging.error(f"No directory backup found matching {pattern}; cannot restore plugins.")
+        backup_folder = self._latest_backup(full_backup)
+        if not backup_folder:
+            logging.error("No %s directory backup found in %s; cannot restore plugins.", 'full' if full_backup else 'partial', self.folder_backup_path)
             return
-        backup_folder = max(candidates, key=os.path.getmtime)
 
         # In a full backup the moodle source lives under <backup>/<moodle>/.
         backup_moodle_root = os.path.join(backup_folder, self.moodle) if full_backup else backup_folder
@@ -312,7 +823,7 @@ class MoodleBackupManager:
         backup_code_root = self._find_code_root(backup_moodle_root)
         clone_code_root = self._find_code_root(clone_path)
         if backup_code_root != backup_moodle_root or clone_code_root != clone_path:
-            logging.info(f"Detected Moodle public-dir layout. Backup code root: {backup_code_root}, clone code root: {clone_code_root}.")
+            logging.info("Detected Moodle public-dir layout. Backup code root: %s, clone code root: %s.", backup_code_root, clone_code_root)
 
         # Submodule paths are already handled by --restore-submodules; skip them here.
         # .gitmodules sits at the repo root, but paths inside are relative to it,
@@ -346,14 +857,14 @@ class MoodleBackupManager:
                 continue
             rel_path = os.path.relpath(dirpath, backup_code_root)
             if rel_path in submodule_paths:
-                logging.debug(f"Skipping plugin {rel_path}: handled as a git submodule, not a restorable plugin.")
+                logging.debug("Skipping plugin %s: handled as a git submodule, not a restorable plugin.", rel_path)
                 continue
             dst = os.path.join(clone_code_root, rel_path)
             if os.path.exists(dst):
                 # Already in the new clone: a core plugin, or a third-party one
                 # that the repo/submodules already provide. Nothing to restore.
                 self.skipped_plugins.append(rel_path)
-                logging.debug(f"Skipping plugin {rel_path}: already present in new clone.")
+                logging.debug("Skipping plugin %s: already present in new clone.", rel_path)
                 continue
             candidates.append((rel_path, dirpath, dst))
 
@@ -364,8 +875,9 @@ class MoodleBackupManager:
         plugins_to_restore = []
         restored_roots = []
         for rel_path, src, dst in candidates:
-            if any(rel_path == root or rel_path.startswith(root + os.sep) for root in restored_roots):
-                logging.debug(f"Skipping plugin {rel_path}: nested inside {next(r for r in restored_roots if rel_path.startswith(r + os.sep))}, restored with its parent.")
+            parent = next((root for root in restored_roots if rel_path == root or rel_path.startswith(root + os.sep)), None)
+            if parent is not None:
+                logging.debug("Skipping plugin %s: nested inside %s, restored with its parent.", rel_path, parent)
                 continue
             restored_roots.append(rel_path)
             plugins_to_restore.append((rel_path, src, dst))
@@ -377,14 +889,14 @@ class MoodleBackupManager:
 
         # In manual mode let the user pick which discovered plugins to restore.
         if selection_mode == "manual":
-            logging.info(f"Found {len(plugins_to_restore)} missing third-party plugin(s) in backup.")
+            logging.info("Found %s missing third-party plugin(s) in backup.", len(plugins_to_restore))
             selected = []
             for rel_path, src, dst in plugins_to_restore:
                 if ApplicationSetup.confirm(f"Restore plugin {rel_path}?", "y"):
                     selected.append((rel_path, src, dst))
                 else:
                     self.skipped_plugins.append(rel_path)
-                    logging.info(f"Skipping plugin {rel_path}: deselected by user.")
+                    logging.info("Skipping plugin %s: deselected by user.", rel_path)
             plugins_to_restore = selected
             if not plugins_to_restore:
                 logging.info("No plugins selected for restore.")
@@ -393,26 +905,33 @@ class MoodleBackupManager:
 
         if self.dry_run:
             for rel_path, src, dst in plugins_to_restore:
-                logging.info(f"[Dry Run] Would copy plugin {rel_path} from {src} to {dst}")
+                logging.info("[Dry Run] Would copy plugin %s from %s to %s", rel_path, src, dst)
                 self.restored_plugins.append(rel_path)
         else:
             for rel_path, src, dst in plugins_to_restore:
+                # Topmost directory this restore creates: dst itself, or the first
+                # missing ancestor that makedirs below will create.
+                chown_root, parent = dst, os.path.dirname(dst)
+                while not os.path.exists(parent):
+                    chown_root, parent = parent, os.path.dirname(parent)
                 try:
                     os.makedirs(os.path.dirname(dst), exist_ok=True)
                     subprocess.run(['cp', '-r', src, dst], check=True)
-                    logging.info(f"Restored plugin {rel_path} from backup.")
+                    logging.info("Restored plugin %s from backup.", rel_path)
                     self.restored_plugins.append(rel_path)
                 except subprocess.CalledProcessError as e:
-                    logging.error(f"Failed to restore plugin {rel_path}: {e.stderr}")
+                    logging.error("Failed to restore plugin %s: %s", rel_path, e.stderr)
+                    continue
 
-            if self.restored_plugins:
+                # The rest of the clone was already chowned by git_clone; only the
+                # copied plugin and the directories makedirs created need it.
                 try:
-                    subprocess.run(['chown', f'{chown_user}:{chown_group}', clone_path, '-R'], check=True)
-                except subprocess.CalledProcessError as e:
-                    logging.error(f"Setting ownership after plugin restore failed: {e.stderr}")
+                    _chown_tree(chown_root, chown_user, chown_group)
+                except (LookupError, OSError) as e:
+                    logging.error("Setting ownership after plugin restore failed for %s: %s", rel_path, e)
 
         self.runtime_restore_plugins = int(time.time() - start)
-        logging.info(f"Plugin restore completed in {self.runtime_restore_plugins} seconds. Restored: {len(self.restored_plugins)}, already present: {len(self.skipped_plugins)}.")
+        logging.info("Plugin restore completed in %s seconds. Restored: %s, already present: %s.", self.runtime_restore_plugins, len(self.restored_plugins), len(self.skipped_plugins))
 
     def moodle_cli_upgrade(self, moodle_maintenance_mode_flag, force_continue):
         """Upgrading Moodle instance via admin/cli/upgrade.php with pre/post system checks"""
@@ -421,8 +940,8 @@ class MoodleBackupManager:
         moodle_upgrade_script = os.path.join(self.path, self.moodle, "admin/cli/upgrade.php")
 
         if self.dry_run:
-            logging.info(f"[Dry Run] Would run: php {moodle_upgrade_script} --non-interactive")
-            logging.info(f"[Dry Run] Would run system checks using: php admin/cli/checks.php")
+            logging.info("[Dry Run] Would run: php %s --non-interactive", moodle_upgrade_script)
+            logging.info("[Dry Run] Would run system checks using: php admin/cli/checks.php")
         else:
             # Run pre-upgrade checks
             self.run_moodle_check(before_upgrade=True, force_continue=force_continue)
@@ -454,7 +973,7 @@ class MoodleBackupManager:
                                 logging.info(line)
                             # Moodle uses !! prefix for errors/warnings
                             elif line.startswith('!!'):
-                                logging.error(f"{line}")
+                                logging.error("%s", line)
                                 error_detail = f"{current_section}: {line}" if current_section else line
                                 error_lines.append(error_detail)
                             elif 'error' in line.lower() or 'failed' in line.lower():
@@ -479,7 +998,7 @@ class MoodleBackupManager:
                                 current_section = line.strip('= ')
                                 logging.info(line)
                             elif line.startswith('!!'):
-                                logging.error(f"{line}")
+                                logging.error("%s", line)
                                 error_detail = f"{current_section}: {line}" if current_section else line
                                 error_lines.append(error_detail)
                             elif 'error' in line.lower() or 'failed' in line.lower():
@@ -497,7 +1016,7 @@ class MoodleBackupManager:
                     self.moodle_maintenance_mode(False)
 
                 if process.returncode != 0:
-                    logging.error(f"Moodle upgrade failed with exit code {process.returncode}")
+                    logging.error("Moodle upgrade failed with exit code %s", process.returncode)
                     self.upgrade_failed = True
                     self.upgrade_error_details.append(f"Exit code: {process.returncode}")
                     # Add captured error lines to details
@@ -505,7 +1024,7 @@ class MoodleBackupManager:
                         self.upgrade_error_details.append(err_line)
 
             except Exception as e:
-                logging.error(f"Unexpected error during Moodle upgrade: {e}")
+                logging.error("Unexpected error during Moodle upgrade: %s", e)
                 self.upgrade_failed = True
                 self.upgrade_error_details.append(f"Unexpected error: {e}")
 
@@ -521,13 +1040,13 @@ class MoodleBackupManager:
         command = f"php {os.path.join(self.path, self.moodle, 'admin/cli/maintenance.php')} --{mode}"
 
         if self.dry_run:
-            logging.info(f"[Dry Run] Would run: {command}")
+            logging.info("[Dry Run] Would run: %s", command)
         else:
             try:
                 subprocess.run(command, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                logging.info(f"Moodle maintenance mode {mode}d successfully.")
+                logging.info("Moodle maintenance mode %sd successfully.", mode)
             except subprocess.CalledProcessError as e:
-                logging.error(f"Failed to {mode} maintenance mode: {e.stderr}")
+                logging.error("Failed to %s maintenance mode: %s", mode, e.stderr)
 
     def run_moodle_check(self, before_upgrade=True, force_continue=False):
         """Run Moodle system check before or after upgrades, logging results with appropriate log levels."""
@@ -539,7 +1058,7 @@ class MoodleBackupManager:
         else:
             phase = "after upgrade"
             auto_continue_choice = "y"
-        logging.info(f"Running Moodle system check ({phase})...")
+        logging.info("Running Moodle system check (%s)...", phase)
         logging.info(SEPARATOR)
 
         try:
@@ -565,19 +1084,19 @@ class MoodleBackupManager:
                 logging.debug(formatted_message)
 
             if result.returncode != 0:
-                logging.critical(f"Moodle system check ({phase}) failed with exit code {result.returncode}")
+                logging.critical("Moodle system check (%s) failed with exit code %s", phase, result.returncode)
 
         except Exception as e:
-            logging.critical(f"Unexpected error while running Moodle system check ({phase}): {str(e)}")
+            logging.critical("Unexpected error while running Moodle system check (%s): %s", phase, str(e))
             error = True
 
         if error:
             timeout = 60
             if not force_continue:
-                logging.info(f"Pausing for manual intervention... (script will continue automatically in {timeout}s)")
+                logging.info("Pausing for manual intervention... (script will continue automatically in %ss)", timeout)
                 if not ApplicationSetup.confirm(f"Errors detected in Moodle check. Do you want to continue?", auto_continue_choice, timeout):
-                    logging.critical(f"Execution stopped due to errors in Moodle system check ({phase}).")
+                    logging.critical("Execution stopped due to errors in Moodle system check (%s).", phase)
                     sys.exit(1)
 
         logging.info(SEPARATOR)
-        logging.info(f"Finished Moodle system check")
\ No newline at end of file
+        logging.info("Finished Moodle system check")
\ No newline at end of file
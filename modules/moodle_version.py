@@ -13,32 +13,33 @@ class MoodleVersionChecker:
 
     def get_local_version(self):
         """Retrieve Moodle version information from the local installation."""
-        # Try new structure first (Moodle 5.1+), then fall back to old structure
-        version_file = os.path.join(self.moodle_path, "public", "version.php")
-        
-        if not os.path.exists(version_file):
-            # Fall back to old structure (Moodle < 5.1)
-            version_file = os.path.join(self.moodle_path, "version.php")
-            
-        if not os.path.exists(version_file):
+        # Try new structure first (Moodle 5.1+), then fall back to old structure (Moodle < 5.1).
+        # Opening directly instead of checking os.path.exists first saves a stat per candidate.
+        candidates = (
+            os.path.join(self.moodle_path, "public", "version.php"),
+            os.path.join(self.moodle_path, "version.php"),
+        )
+        for version_file in candidates:
+            try:
+                with open(version_file, "r") as f:
+                    content = f.read()
+                break
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logging.error("Error reading Moodle version: %s", e)
+                return "Unknown", "Unknown"
+        else:
             logging.warning("Moodle version file not found.")
             return "Unknown", "Unknown"
 
-        try:
-            with open(version_file, "r") as f:
-                content = f.read()
-
-            # Human-friendly version (e.g., "4.1+ (Build: 20240115)")
-            release_match = re.search(r"\$release\s*=\s*'([^']+)'", content)
-            # Numeric version (e.g., "2024042205.00")
-            build_match = re.search(r"\$version\s*=\s*([\d\.]+);", content)
-
-            return release_match.group(1) if release_match else "Unknown", \
-                   build_match.group(1) if build_match else "Unknown"
+        # Human-friendly version (e.g., "4.1+ (Build: 20240115)")
+        release_match = re.search(r"\$release\s*=\s*'([^']+)'", content)
+        # Numeric version (e.g., "2024042205.00")
+        build_match = re.search(r"\$version\s*=\s*([\d\.]+);", content)
 
-        except Exception as e:
-            logging.error(f"Error reading Moodle version: {e}")
-            return "Unknown", "Unknown"
+        return release_match.group(1) if release_match else "Unknown", \
+               build_match.group(1) if build_match else "Unknown"
 
     def get_remote_version(self):
         """Retrieve Moodle version information from the remote Git repository."""
@@ -62,9 +63,9 @@ class MoodleVersionChecker:
                 return release_match.group(1) if release_match else "Unknown", \
                        build_match.group(1) if build_match else "Unknown"
             else:
-                logging.warning(f"Failed to retrieve remote version (HTTP {response.status_code})")
+                logging.warning("Failed to retrieve remote version (HTTP %s)", response.status_code)
                 return "Unknown", "Unknown"
 
         except requests.RequestException as e:
-            logging.error(f"Error fetching remote version: {e}")
+            logging.error("Error fetching remote version: %s", e)
             return "Unknown", "Unknown"
\ No newline at end of file
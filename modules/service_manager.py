@@ -1,60 +1,85 @@
-import apt
+import functools
 import logging
+import os
 import subprocess
 
+# Where systemd looks for unit files (admin overrides, runtime, distribution).
+SYSTEMD_UNIT_DIRS = ["/etc/systemd/system", "/run/systemd/system", "/lib/systemd/system", "/usr/lib/systemd/system"]
+
+@functools.lru_cache(maxsize=None)
+def _find_unit(service_name):
+    """Return the resolved path of service_name's systemd unit file, or None if no such unit is installed.
+
+    Installed units do not change during a run, so each lookup is done only once.
+    """
+    for unit_dir in SYSTEMD_UNIT_DIRS:
+        unit_file = os.path.join(unit_dir, f"{service_name}.service")
+        if os.path.exists(unit_file):
+            # Resolve aliases (e.g. mysql.service -> mariadb.service)
+            return os.path.realpath(unit_file)
+    return None
+
 class ServiceManager:
     """Handles web and database service restarts."""
 
     def __init__(self, dry_run=False):
         self.dry_run = dry_run
-        self.cache = apt.Cache()  # Load package cache once and reuse
+        self._webserver = None
+
+    def detect_webserver(self):
+        """Return the installed webserver service ("apache2" or "nginx"), or None.
+
+        Detected once; the stop/start/restart calls of a run reuse the result.
+        """
+        if self._webserver is None:
+            if _find_unit("apache2"):
+                self._webserver = "apache2"
+            elif _find_unit("nginx"):
+                self._webserver = "nginx"
+            else:
+                self._webserver = ""
+        return self._webserver or None
 
     def restart_webserver(self, action):
         """start / stop the apache or nginx webserver, depending on which one is installed"""
-        webserver = None
-
-        if self.cache["apache2"].is_installed:
-            webserver = "apache2"
-        elif self.cache["nginx"].is_installed:
-            webserver = "nginx"
+        webserver = self.detect_webserver()
 
         if not webserver:
             logging.warning("No supported web server found (Apache/Nginx).")
             return
 
-        logging.info(f"Attempting to {action} the {webserver} service.")
+        logging.info("Attempting to %s the %s service.", action, webserver)
         self._run_systemctl(action, webserver)
 
     def restart_database(self, action):
         """Start / stop the installed database service, based on availability."""
-        database_services = {
-            "mysql-server": "mysql",
-            "mariadb-server": "mariadb",
-            "postgresql": "postgresql",
-            "mssql-server": "mssql-server",
-            "mongodb": "mongodb",
-            "redis-server": "redis",
-        }
-
-        # Identify installed database services
-        installed_db_services = [service for service in database_services if service in self.cache and self.cache[service].is_installed]
+        database_services = ["mysql", "mariadb", "postgresql", "mssql-server", "mongodb", "mongod", "redis-server"]
+
+        # Identify installed database services. Aliases resolve to the same unit
+        # file (MariaDB also installs mysql.service), so restart each unit once.
+        installed_db_services = []
+        seen_units = set()
+        for service_name in database_services:
+            unit = _find_unit(service_name)
+            if unit and unit not in seen_units:
+                seen_units.add(unit)
+                installed_db_services.append(service_name)
 
         if not installed_db_services:
             logging.warning("No supported database server found.")
             return
 
-        for db_service in installed_db_services:
-            service_name = database_services[db_service]
-            logging.info(f"Attempting to {action} the {service_name} service.")
+        for service_name in installed_db_services:
+            logging.info("Attempting to %s the %s service.", action, service_name)
             self._run_systemctl(action, service_name)
 
     def _run_systemctl(self, action, service_name):
         """Runs the systemctl command for service management."""
         if self.dry_run:
-            logging.info(f"[Dry Run] Would run: systemctl {action} {service_name}")
+            logging.info("[Dry Run] Would run: systemctl %s %s", action, service_name)
         else:
             try:
                 subprocess.run(['systemctl', action, service_name], check=True)
-                logging.info(f"{service_name} service {action}ed successfully.")
+                logging.info("%s service %sed successfully.", service_name, action)
             except subprocess.CalledProcessError as e:
-                logging.error(f"Failed to {action} the {service_name} service: {e.stderr}")
\ No newline at end of file
+                logging.error("Failed to %s the %s service: %s", action, service_name, e.stderr)
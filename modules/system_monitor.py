@@ -1,5 +1,6 @@
 import os
 import re
+import stat
 import logging
 import time
 import threading
@@ -11,6 +12,11 @@ import subprocess
 # database name interpolated into the SQL query below.
 _DB_NAME_RE = re.compile(r'^[A-Za-z0-9_$\-]{1,64}$')
 
+# The /proc/meminfo fields `free -m` reports, in kB.
+_MEMINFO_RE = re.compile(rb'^(MemTotal|MemFree|MemAvailable|Buffers|Cached|Shmem):\s+(\d+)', re.MULTILINE)
+
+
+BYTES_PER_MB = 1024 * 1024
 
 class SystemMonitor:
     """Monitors system resource usage and database dump progress."""
@@ -23,7 +29,7 @@ class SystemMonitor:
         # this check a malicious or malformed name (e.g. one containing a
         # quote) would be interpolated directly into the SQL string below.
         if not _DB_NAME_RE.match(database or ''):
-            logging.error(f"Refusing to query database with invalid name: {database!r}")
+            logging.error("Refusing to query database with invalid name: %r", database)
             return 1
         # SQL query to get database size
         query = """
@@ -57,14 +63,24 @@ class SystemMonitor:
             else:
                 return 1
         else:
-            logging.error(f"Error: {result.stderr}")
+            logging.error("Error: %s", result.stderr)
             return 1
 
-    def monitor_dump_progress(self, dump_file, database, user, password, check_interval=5, log_interval=60, stagnation_threshold=60):
+    @staticmethod
+    def path_size(path):
+        """Return the size of a file, or the total size of the files in a directory (e.g. a mydumper dump)."""
+        st = os.stat(path)
+        if not stat.S_ISDIR(st.st_mode):
+            return st.st_size
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    def monitor_dump_progress(self, dump_file, database, user, password, size_ratio=1.0, db_size_mb=None, check_interval=5, log_interval=60, stagnation_threshold=60):
         """
         Monitors the size of the dump file and logs its progress periodically.
         
-        :param dump_file: The path to the dump file.
+        :param dump_file: The path to the dump file, or the directory of a mydumper dump.
+        :param size_ratio: Expected size of the dump file relative to plain SQL (below 1 for compressed dumps).
+        :param db_size_mb: Database size in MB if already known; queried from the server otherwise.
         :param stop_event: A threading event to signal the thread to stop.
         :param check_interval: Time in seconds between file size checks.
         :param log_interval: Minimum time in seconds between logs.
@@ -75,38 +91,57 @@ class SystemMonitor:
         last_log_time = 0
         start_time = time.time()
         approximate_db_to_dump_ratio = 0.644  # Adjust this ratio based on database characteristics
-        estimated_total_size = self.get_database_size_mb(database, user, password) * approximate_db_to_dump_ratio
-        logging.info(f"Monitoring database dump progress: {dump_file} | Estimated size: {estimated_total_size / 1024:.2f} GB")
+        if db_size_mb is None:
+            db_size_mb = self.get_database_size_mb(database, user, password)
+        estimated_total_size = db_size_mb * approximate_db_to_dump_ratio * size_ratio
+        logging.info("Monitoring database dump progress: %s | Estimated size: %.2f GB", dump_file, estimated_total_size / 1024)
         
         while not self.stop_event.is_set():
-            if os.path.exists(dump_file):
-                current_size = os.path.getsize(dump_file)
+            try:
+                current_size = self.path_size(dump_file)
+            except FileNotFoundError:
+                current_size = None  # not created yet
+
+            if current_size is not None:
                 now = time.time()
 
                 if current_size == last_size:
                     stagnation_time += check_interval
                     if stagnation_time >= stagnation_threshold and now - last_log_time >= log_interval:
-                        logging.warning(f"Database dump file size hasn't changed for {stagnation_time} seconds. Possible stall?")
+                        logging.warning("Database dump file size hasn't changed for %d seconds. Possible stall?", stagnation_time)
                         last_log_time = now
                 else:
                     stagnation_time = 0
                     if now - last_log_time >= log_interval:
-                        size_mb = current_size / (1024 * 1024)
-                        elapsed_time = time.time() - start_time
+                        size_mb = current_size / BYTES_PER_MB
+                        elapsed_time = now - start_time
                         speed = size_mb / elapsed_time  # bytes per second
                         remaining_time_sec = (estimated_total_size - size_mb) / speed if speed > 0 else float('inf')
                         percent = (size_mb / estimated_total_size) * 100
                         if size_mb >= 1024:
-                            logging.info(f"Database dump progress: {percent:.2f}% | {size_mb / 1024:.2f} GB | Elapsed: {elapsed_time:.1f}s | Estimated remaining: {remaining_time_sec:.1f}s")
+                            logging.info("Database dump progress: %.2f%% | %.2f GB | Elapsed: %.1fs | Estimated remaining: %.1fs", percent, size_mb / 1024, elapsed_time, remaining_time_sec)
                         else:
-                            logging.info(f"Database dump progress: {percent:.2f}% | {size_mb:.2f} MB | Elapsed: {elapsed_time:.1f}s | Estimated remaining: {remaining_time_sec:.1f}s")
+                            logging.info("Database dump progress: %.2f%% | %.2f MB | Elapsed: %.1fs | Estimated remaining: %.1fs", percent, size_mb, elapsed_time, remaining_time_sec)
                         last_log_time = now
                 last_size = current_size
 
-            time.sleep(check_interval)
+            self.stop_event.wait(check_interval)
 
         logging.info("Database dump monitoring stopped.")
 
+    @staticmethod
+    def read_memory_stats():
+        """Return (total, used, free, shared, buff/cache, available) memory in MB, as `free -m` reports them.
+
+        Reads /proc/meminfo directly instead of starting a shell and `free` on every poll.
+        """
+        with open('/proc/meminfo', 'rb') as f:
+            meminfo = {key: int(value) >> 10 for key, value in _MEMINFO_RE.findall(f.read())}
+        total = meminfo[b'MemTotal']
+        free = meminfo[b'MemFree']
+        buff_cached = meminfo[b'Buffers'] + meminfo[b'Cached']
+        return total, total - free - buff_cached, free, meminfo[b'Shmem'], buff_cached, meminfo[b'MemAvailable']
+
     def monitor_memory_usage(self):
         """Monitors memory usage and logs more frequently as free memory decreases."""
         # Track previous memory states to detect recovery
@@ -117,8 +152,7 @@ class SystemMonitor:
 
         while not self.stop_event.is_set():
             # Get memory statistics
-            mem_line = next(line for line in os.popen('free -t -m').readlines() if line.startswith("Mem"))
-            total_memory, used_memory, free_memory, shared_memory, buff_cached_memory, available_memory = map(int, mem_line.split()[1:7])
+            total_memory, used_memory, free_memory, shared_memory, buff_cached_memory, available_memory = self.read_memory_stats()
 
             # === CRITICAL MEMORY STATE ===
             if available_memory < 250:
@@ -182,18 +216,18 @@ class SystemMonitor:
                 total_memory, used_memory, free_memory, shared_memory, buff_cached_memory, available_memory
             )
 
-            time.sleep(sleep_time)
+            self.stop_event.wait(sleep_time)
 
         logging.info("Memory monitoring stopped.")
 
-    def start_monitoring(self, dump_file, dbname, dbuser, dbpass):
+    def start_monitoring(self, dump_file, dbname, dbuser, dbpass, size_ratio=1.0, db_size_mb=None):
         """Starts monitoring memory and optionally dump progress in separate threads."""
         logging.info("Starting system monitoring...")
         
         self.memory_thread = threading.Thread(target=self.monitor_memory_usage)
         self.memory_thread.start()
 
-        self.dump_thread = threading.Thread(target=self.monitor_dump_progress, args=(dump_file, dbname, dbuser, dbpass,))
+        self.dump_thread = threading.Thread(target=self.monitor_dump_progress, args=(dump_file, dbname, dbuser, dbpass, size_ratio, db_size_mb,))
         self.dump_thread.start()
 
     def stop_monitoring(self):
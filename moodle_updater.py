@@ -5,15 +5,16 @@ import logging
 import os
 import subprocess
 import sys
-import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 
 # Third-Party Libraries
 from logging.handlers import RotatingFileHandler
 
 # Modules
 from modules.application_setup import ApplicationSetup
-from modules.moodle_backup import MoodleBackupManager
+from modules.moodle_backup import MoodleBackupManager, copy_file
 from modules.config_manager import ConfigManager
 from modules.moodle_version import MoodleVersionChecker
 from modules.service_manager import ServiceManager
@@ -21,6 +22,61 @@ from modules.service_manager import ServiceManager
 # Constants
 SEPARATOR = "-------------------------------------------------------------------------"
 
+def run_concurrently(tasks):
+    """Run (name, callable) tasks in a thread pool and wait for all of them.
+
+    The phases spend their time in rsync, mysqldump and git subprocesses, which
+    do not hold the GIL, and they report back through the shared
+    MoodleBackupManager instance, so threads are used rather than processes.
+    An exception in one task is logged and does not stop the others, so the
+    webserver still gets restarted afterwards.
+    """
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {executor.submit(task): name for name, task in tasks}
+        # Report each phase as soon as it is done, not in submission order.
+        for future in as_completed(futures):
+            try:
+                future.result()
+                logging.info("Finished %s after %s seconds.", futures[future], int(time.time() - start))
+            except Exception:
+                logging.exception("Unexpected error during %s", futures[future])
+
+def non_interactive_default(config, option, fallback=False):
+    """Answer to use for a prompt in non-interactive mode when its command line flag is not given.
+
+    Read from the [non_interactive] section of config.ini.
+    """
+    return config.get('non_interactive', option, fallback=str(fallback)) == "True"
+
+def check_db_connection(dbname, dbuser, dbpass):
+    """Check that dbuser can log in and open dbname, and fetch the database size.
+
+    Runs a single query instead of listing the database's tables with
+    mysqlshow. (mysqladmin ping would be cheaper still, but it succeeds even
+    when the credentials are rejected.) The size it returns is handed to the
+    dump monitor, which then needs no connection of its own.
+    Returns (True, size_mb, "") on success, where size_mb is None for a
+    database without tables, and (False, None, stderr) on failure.
+    """
+    # DATABASE() is the database named on the command line, so no identifier
+    # has to be interpolated into the query.
+    query = ("SELECT ROUND(SUM(data_length + index_length) / 1024 / 1024, 2) "
+             "FROM information_schema.tables WHERE table_schema = DATABASE()")
+    try:
+        # Pass the password via MYSQL_PWD so it is not visible in `ps`.
+        result = subprocess.run(
+            ['mysql', '-u', dbuser, '-N', '-e', query, dbname],
+            capture_output=True, text=True, check=True,
+            env={**os.environ, 'MYSQL_PWD': dbpass}
+        )
+    except subprocess.CalledProcessError as e:
+        return False, None, e.stderr
+    try:
+        return True, float(result.stdout.strip()), ""
+    except ValueError:  # NULL: no tables yet
+        return True, None, ""
+
 def main():
     dry_run = False
     pwd = os.path.dirname(os.path.abspath(__file__))
@@ -50,7 +106,7 @@ def main():
     if "--help" in sys.argv or "-h" in sys.argv:
         print("Usage: python3 moodle_updater.py [options]")
         print("Options:")
-        print("  --non-interactive         Run in non-interactive mode (default: False)")
+        print("  --non-interactive         Run in non-interactive mode, unset options are read from [non_interactive] in config.ini (default: False, or auto_confirm in config.ini)")
         print("  --directory-backup        Start directory backup process (default: True unless non-interactive is set then default: False)")
         print("  --db-dump                 Start DB dump process (default: True unless non-interactive is set then default: False)")
         print("  --git-clone               Start git clone process (default: True unless non-interactive is set then default: False)")
@@ -69,10 +125,8 @@ def main():
         print("  --help, -h                Show this help message")
         sys.exit(0)
 
-    non_interactive = False
-    # Check for non-interactive mode
-    if "--non-interactive" in sys.argv:
-        non_interactive = True
+    # Check for non-interactive mode; auto_confirm in config.ini enables it for every run (e.g. cron)
+    non_interactive = "--non-interactive" in sys.argv or config.get('settings', 'auto_confirm', fallback="False") == "True"
 
     # Get user confirmation for operations
     # alternatively to the confirm action, command line arguments can be used
@@ -81,34 +135,34 @@ def main():
     elif not non_interactive:
         dir_backup = ApplicationSetup.confirm("Start directory backup process?", "y")
     else:
-        dir_backup = False
+        dir_backup = non_interactive_default(config, "directory_backup")
 
     if "--db-dump" in sys.argv:
         db_dump = True
     elif not non_interactive:
         db_dump = ApplicationSetup.confirm("Start DB dump process?", "y")
     else:
-        db_dump = False
+        db_dump = non_interactive_default(config, "db_dump")
     
     if "--git-clone" in sys.argv:
         git_clone = True
     elif not non_interactive:
         git_clone = ApplicationSetup.confirm("Start git clone process?", "y")
     else:
-        git_clone = False
+        git_clone = non_interactive_default(config, "git_clone")
     
     if "--moodle-cli-upgrade" in sys.argv:
         moodle_cli_upgrade = True
     elif not non_interactive:
         moodle_cli_upgrade = ApplicationSetup.confirm("Start moodle cli upgrade process afterwards?", "y")
     else:
-        moodle_cli_upgrade = False
+        moodle_cli_upgrade = non_interactive_default(config, "moodle_cli_upgrade")
 
     logging.info(SEPARATOR)
-    logging.info(f"dirbackup: {dir_backup}")
-    logging.info(f"dbdump: {db_dump}")
-    logging.info(f"gitclone: {git_clone}")
-    logging.info(f"moodlecliupgrade: {moodle_cli_upgrade}")
+    logging.info("dirbackup: %s", dir_backup)
+    logging.info("dbdump: %s", db_dump)
+    logging.info("gitclone: %s", git_clone)
+    logging.info("moodlecliupgrade: %s", moodle_cli_upgrade)
     logging.info(SEPARATOR)
 
     # Abort if no tasks were selected
@@ -122,11 +176,19 @@ def main():
     if not folder_backup_path.endswith("/"):
         folder_backup_path = os.path.join(folder_backup_path, '')
 
+    try:
+        submodule_jobs = int(config.get('settings', 'submodule_jobs', fallback='') or 0) or None
+    except ValueError:
+        logging.warning("Invalid submodule_jobs in config.ini, using the default.")
+        submodule_jobs = None
+
     backup_manager = MoodleBackupManager(
         path=path,
         moodle=moodle,
         folder_backup_path=folder_backup_path,
-        dry_run=dry_run
+        dry_run=dry_run,
+        shallow_clone=config.get('settings', 'shallow_clone', fallback="True") == "True",
+        submodule_jobs=submodule_jobs
     )
 
     # Acquire a per-instance lock so two concurrent moodle_updater.py runs
@@ -141,8 +203,8 @@ def main():
     except OSError as e:
         if e.errno in (errno.EAGAIN, errno.EACCES):
             logging.error(
-                f"Another moodle_updater.py run is already in progress for "
-                f"instance '{moodle}' (lock file: {lock_path}). Aborting."
+                "Another moodle_updater.py run is already in progress for "
+                "instance '%s' (lock file: %s). Aborting.", moodle, lock_path
             )
             sys.exit(1)
         raise
@@ -154,7 +216,7 @@ def main():
     elif not non_interactive:
         restart_webserver_flag = ApplicationSetup.confirm("Restart webserver automatically?", "y")
     else:
-        restart_webserver_flag = False
+        restart_webserver_flag = non_interactive_default(config, "restart_webserver")
 
     restart_database_flag = False
     moodle_maintenance_mode_flag = False
@@ -174,7 +236,10 @@ def main():
         logging.info("Preparing Moodle directory path.")
         if not non_interactive and not ApplicationSetup.confirm(f"Is this the correct Moodle directory? {path}", "y"):
             path = input("Please enter a path: ").rstrip("/")
+            # Everything derived from the path has to follow the correction.
             full_path = os.path.join(path, moodle)
+            configphppath = os.path.join(full_path, 'config.php')
+            backup_manager.path = path
 
     # Directory backup process
     if dir_backup:
@@ -183,7 +248,7 @@ def main():
         elif not non_interactive:
             full_backup = ApplicationSetup.confirm("Backup entire folder (containing moodle, moodledata, and data)?", "n")
         else:
-            full_backup = False
+            full_backup = non_interactive_default(config, "full_backup")
 
     # Database dump process
     if db_dump:
@@ -191,7 +256,16 @@ def main():
         if db_dump_path in ["pwd", ""]:
             db_dump_path = pwd
         read_db_from_config = config.get('database', 'read_db_from_config', fallback="True") == "True"
+        dump_compression = config.get('database', 'dump_compression', fallback='none').lower()
+        net_buffer_length = config.get('database', 'net_buffer_length', fallback='16777216')
+        dump_tool = config.get('database', 'dump_tool', fallback='mysqldump').lower()
+        try:
+            mydumper_threads = int(config.get('database', 'mydumper_threads', fallback='') or 0) or None
+        except ValueError:
+            logging.warning("Invalid mydumper_threads in config.ini, using the default.")
+            mydumper_threads = None
         dbpass = ""
+        db_size_mb = None
 
         if not read_db_from_config:
             dbname = config.get('database', 'db_name', fallback='moodle')
@@ -212,30 +286,20 @@ def main():
             restart_database_flag = False
 
         if dry_run:
-            logging.info(f"[Dry Run] Would run: mysqlshow to check if DB: {dbname} is accessible with user: {dbuser}")
-            result = "returncode=0"
+            logging.info("[Dry Run] Would check if DB: %s is accessible with user: %s", dbname, dbuser)
         else:
-            try:
-                subprocess.run(
-                    ['mysqlshow', '-u', dbuser, f'-p{dbpass}', dbname],
-                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
-                )
-                logging.info("Connection to DB established.")
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Connection to DB failed: {e.stderr}")
+            connected, db_size_mb, error = check_db_connection(dbname, dbuser, dbpass)
+            if not connected:
+                logging.error("Connection to DB failed: %s", error)
                 while not dbpass.strip():
                     dbpass = input("Please enter DB password again: ").strip()
                     if dbpass:
                         break
-                try:
-                    subprocess.run(
-                        ['mysqlshow', '-u', dbuser, f'-p{dbpass}', dbname],
-                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
-                    )
-                    logging.info("Connection to DB established.")
-                except subprocess.CalledProcessError as e:
-                    logging.error(f"Connection to DB failed: {e.stderr}")
+                connected, db_size_mb, error = check_db_connection(dbname, dbuser, dbpass)
+                if not connected:
+                    logging.error("Connection to DB failed: %s", error)
                     sys.exit(1)
+            logging.info("Connection to DB established.")
 
     # Git clone process
     if git_clone:
@@ -251,26 +315,37 @@ def main():
         if local_build != "Unknown" and remote_build != "Unknown":
             try:
                 if float(remote_build) == float(local_build):
-                    logging.info(f"Local Moodle version ({local_release} - (Version: {local_build})) is up-to-date.")
+                    logging.info("Local Moodle version (%s - (Version: %s)) is up-to-date.", local_release, local_build)
                 elif float(remote_build) > float(local_build):
-                    logging.info(f"Newer Moodle version available ({remote_release} - (Version: {remote_build}) > {local_release} - (Version: {local_build})). Proceeding with update.")
+                    logging.info("Newer Moodle version available (%s - (Version: %s) > %s - (Version: %s)). Proceeding with update.", remote_release, remote_build, local_release, local_build)
                 else:
-                    logging.critical(f"Local Moodle version ({local_release} - (Version: {local_build})) is newer than remote ({remote_release} - (Version: {remote_build})). Skipping update.")
+                    logging.critical("Local Moodle version (%s - (Version: %s)) is newer than remote (%s - (Version: %s)). Skipping update.", local_release, local_build, remote_release, remote_build)
                     sys.exit(1)
 
             except Exception as e:
-                logging.error(f"Error parsing Moodle versions: local='{local_release}', remote='{remote_release}'. Exception: {e}")
+                logging.error("Error parsing Moodle versions: local='%s', remote='%s'. Exception: %s", local_release, remote_release, e)
 
+        configphp_source = None
         if not non_interactive and not ApplicationSetup.confirm(f"Do you want to copy {configphppath} from the old directory?", "y"):
             customconfigphppath = input("Please enter a config.php path [press enter to skip]: ")
             if customconfigphppath:
-                with open(customconfigphppath, 'r') as file:
-                    configphp = file.read()
+                configphp_source = customconfigphppath
             else:
                 logging.info("Restore of old config.php skipped.")
         else:
-            with open(configphppath, 'r') as file:
-                configphp = file.read()
+            configphp_source = configphppath
+
+        # The clone replaces the Moodle directory, so keep a snapshot of config.php
+        # next to the script and hand its path to the clone instead of the content.
+        configphp = configphp_source
+        configphp_mode = None
+        if configphp_source and not dry_run:
+            # The snapshot is owner-only; the restored config.php gets the original's mode.
+            configphp_mode = os.stat(configphp_source).st_mode
+            configphp = os.path.join(pwd, '.config_php_snapshot')
+            # Owner-only: the snapshot holds the DB credentials and stays behind if the clone fails.
+            copy_file(configphp_source, configphp, mode=0o600)
+            os.chmod(configphp, 0o600)  # also when a snapshot from an interrupted run was reused
 
         if not non_interactive and not ApplicationSetup.confirm(f"Do you want to git checkout {branch}?", "y"):
             branch = input("Please enter custom branch: ")
@@ -280,7 +355,7 @@ def main():
         elif not non_interactive:
             sync_submodules = ApplicationSetup.confirm("Do you want to sync and update all submodules?", "y")
         else:
-            sync_submodules = True
+            sync_submodules = non_interactive_default(config, "sync_submodules", True)
 
         if "--restore-submodules" in sys.argv:
             if dir_backup:
@@ -334,7 +409,7 @@ def main():
         elif not non_interactive:
             moodle_maintenance_mode_flag = ApplicationSetup.confirm("Enable Moodle Maintenance Mode during Moodle CLI Upgrade?", "y")
         else:
-            moodle_maintenance_mode_flag = False
+            moodle_maintenance_mode_flag = non_interactive_default(config, "enable_maintenance_mode")
 
         if "--force-continue" in sys.argv:
             force_continue = True
@@ -348,9 +423,15 @@ def main():
         exit(1)
     # Start operations
     start_time = time.time()
-    logging.info(f"Started at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    started = time.localtime(start_time)
+    logging.info("Started at %s", time.strftime('%Y-%m-%d %H:%M:%S', started))
+    # One timestamp for every artifact of this run, so backups and dumps made
+    # in parallel threads carry the same suffix. Taken from start_time so it
+    # matches the "Started at" line even across a second boundary.
+    timestamp = time.strftime('%Y-%m-%d-%H-%M-%S', started)
 
-    service_manager = ServiceManager(dry_run)  # Create an instance
+    # Only needed when a service has to be stopped, started or restarted.
+    service_manager = ServiceManager(dry_run) if restart_webserver_flag or restart_database_flag else None
 
     if restart_webserver_flag:
         service_manager.restart_webserver("stop")
@@ -359,55 +440,33 @@ def main():
         service_manager.restart_database("restart")
         time.sleep(2) # Pause to ensure the DB is fully ready
 
-    # Handle multithreading if multiple operations were selected
-    if dir_backup and db_dump and git_clone:
-        multithreading = True
-
-        t_backup_clone = threading.Thread(
-            target=backup_manager.dir_backup_and_git_clone,
-            args=(configphp, full_backup, repo, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup,)
-        )
-        t_dump = threading.Thread(target=backup_manager.db_dump, args=(dbname, dbuser, dbpass, verbose, db_dump_path,))
-
-        logging.info("Starting directory backup, git clone, and database dump (multithreaded).")
-        t_backup_clone.start()
-        t_dump.start()
-        t_backup_clone.join()
-        t_dump.join()
-    elif dir_backup and db_dump:
-        multithreading = True
-
-        t_backup = threading.Thread(target=backup_manager.dir_backup, args=(full_backup,))
-        t_dump = threading.Thread(target=backup_manager.db_dump, args=(dbname, dbuser, dbpass, verbose, db_dump_path,))
-
-        logging.info("Starting directory backup and database dump (multithreaded).")
-        t_backup.start()
-        t_dump.start()
-        t_backup.join()
-        t_dump.join()
-    elif db_dump and git_clone:
-        multithreading = True
-
-        t_dump = threading.Thread(target=backup_manager.db_dump, args=(dbname, dbuser, dbpass, verbose, db_dump_path,))
-        t_clone = threading.Thread(target=backup_manager.git_clone, args=(configphp, repo, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup,))
-
-        logging.info("Starting database dump and git clone (multithreaded).")
-        t_dump.start()
-        t_clone.start()
-        t_dump.join()
-        t_clone.join()
-    else:
-        if dir_backup:
-            logging.info("Starting directory backup")
-            backup_manager.dir_backup(full_backup,)
+    # Collect the selected phases and run them in parallel. The directory backup
+    # has to finish reading the old Moodle directory before the clone replaces
+    # it, so the two form a single task when both are selected.
+    tasks = []
+    if dir_backup and git_clone:
+        tasks.append(("directory backup and git clone", partial(
+            backup_manager.dir_backup_and_git_clone, configphp, full_backup, repo, branch, sync_submodules,
+            chown_user, chown_group, restore_submodules_from_backup, timestamp, configphp_mode)))
+    elif dir_backup:
+        tasks.append(("directory backup", partial(backup_manager.dir_backup, full_backup, timestamp)))
+    elif git_clone:
+        tasks.append(("git clone", partial(
+            backup_manager.git_clone, configphp, repo, branch, sync_submodules,
+            chown_user, chown_group, restore_submodules_from_backup, config_php_mode=configphp_mode)))
+    if db_dump:
+        tasks.append(("database dump", partial(
+            backup_manager.db_dump, dbname, dbuser, dbpass, verbose, db_dump_path, timestamp,
+            dump_compression, net_buffer_length, db_size_mb, dump_tool, mydumper_threads)))
 
-        if db_dump:
-            logging.info("Starting database dump")
-            backup_manager.db_dump(dbname, dbuser, dbpass, verbose, db_dump_path)
+    if tasks:
+        multithreading = len(tasks) > 1
+        logging.info("Starting %s%s.", ', '.join(name for name, _ in tasks), ' (multithreaded)' if multithreading else '')
+        run_concurrently(tasks)
 
-        if git_clone:
-            logging.info("Starting git clone")
-            backup_manager.git_clone(configphp, repo, branch, sync_submodules, chown_user, chown_group, restore_submodules_from_backup)
+    # The snapshot is only needed until config.php is back in the new checkout.
+    if git_clone and configphp and configphp != configphp_source and os.path.exists(configphppath):
+        os.remove(configphp)
 
     if restore_plugins_from_backup and git_clone:
         backup_manager.restore_plugins(chown_user, chown_group, full_backup=full_backup if dir_backup else False, selection_mode=restore_plugins_mode)
@@ -421,62 +480,46 @@ def main():
             service_manager.restart_webserver("restart")
 
     runtime = int(time.time() - start_time)  # Convert to integer seconds
-    runtime_backup = backup_manager.runtime_backup
-    runtime_dump = backup_manager.runtime_dump
-    runtime_clone = backup_manager.runtime_clone
-    runtime_cliupgrade = backup_manager.runtime_cliupgrade
-
-    # Log if any operation times were recorded
-    if runtime_backup:
-        logging.info("Directory backup time needed: %d seconds", runtime_backup)
-    else:
-        runtime_backup = 0
-
-    if runtime_dump:
-        logging.info("Database dump time needed: %d seconds", runtime_dump)
-    else:
-        runtime_dump = 0
-
-    if runtime_clone:
-        logging.info("Git clone time needed: %d seconds", runtime_clone)
-    else:
-        runtime_clone = 0
-
-    if runtime_cliupgrade:
-        logging.info("Moodle CLI Upgrade time needed: %d seconds", runtime_cliupgrade)
-    else:
-        runtime_cliupgrade = 0
-
-    runtime_restore_plugins = backup_manager.runtime_restore_plugins
-    if runtime_restore_plugins:
-        logging.info("Plugin restore time needed: %d seconds", runtime_restore_plugins)
-    else:
-        runtime_restore_plugins = 0
-
-    # Log total runtime
-    logging.info("Total execution time (excluding user input): %d seconds", runtime)
+    # Log the recorded operation times and the total runtime as one message
+    runtimes = {
+        "Directory backup": backup_manager.runtime_backup or 0,
+        "Database dump": backup_manager.runtime_dump or 0,
+        "Git clone": backup_manager.runtime_clone or 0,
+        "Moodle CLI Upgrade": backup_manager.runtime_cliupgrade or 0,
+        "Plugin restore": backup_manager.runtime_restore_plugins or 0,
+    }
+    summary, summary_args = [], []
+    for name, seconds in runtimes.items():
+        if seconds:
+            summary.append("%s time needed: %d seconds")
+            summary_args += [name, seconds]
+    summary.append("Total execution time (excluding user input): %d seconds")
+    summary_args.append(runtime)
     if multithreading:
-        logging.info("Time saved with multithreading: %d seconds", runtime_backup + runtime_dump + runtime_clone + runtime_cliupgrade - runtime)
+        sequential = sum(runtimes[name] for name in ("Directory backup", "Database dump", "Git clone", "Moodle CLI Upgrade"))
+        summary.append("Time saved with multithreading: %d seconds")
+        summary_args.append(sequential - runtime)
+    logging.info("\n".join(summary), *summary_args)
 
     # Log failed submodules summary at the end if any failed
     if backup_manager.failed_submodules:
         logging.info(SEPARATOR)
-        logging.warning(f"SUBMODULE SYNC SUMMARY: {backup_manager.submodules_failed} submodule(s) failed to update")
-        logging.warning(f"Failed submodules: {', '.join(backup_manager.failed_submodules)}")
+        logging.warning("SUBMODULE SYNC SUMMARY: %s submodule(s) failed to update", backup_manager.submodules_failed)
+        logging.warning("Failed submodules: %s", ', '.join(backup_manager.failed_submodules))
 
     # Log plugin restore summary at the end if it ran
     if backup_manager.restored_plugins or backup_manager.skipped_plugins:
         logging.info(SEPARATOR)
-        logging.info(f"PLUGIN RESTORE SUMMARY: {len(backup_manager.restored_plugins)} restored, {len(backup_manager.skipped_plugins)} already present")
+        logging.info("PLUGIN RESTORE SUMMARY: %s restored, %s already present", len(backup_manager.restored_plugins), len(backup_manager.skipped_plugins))
         if backup_manager.restored_plugins:
-            logging.info(f"Restored plugins: {', '.join(backup_manager.restored_plugins)}")
+            logging.info("Restored plugins: %s", ', '.join(backup_manager.restored_plugins))
 
     # Log upgrade failure summary at the end if upgrade failed
     if backup_manager.upgrade_failed:
         logging.info(SEPARATOR)
         logging.warning("MOODLE CLI UPGRADE SUMMARY: Upgrade failed!")
         for error in backup_manager.upgrade_error_details:
-            logging.warning(f"  - {error}")
+            logging.warning("  - %s", error)
 
     logging.info(SEPARATOR)
     logging.info("Finished at %s", time.strftime("%Y-%m-%d %H:%M:%S"))
@@ -0,0 +1,151 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from modules import config_manager
+from modules.config_manager import BufferedRotatingFileHandler, ConfigManager
+
+
+class ReadMoodleConfigTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'config.php')
+        config_manager._moodle_config_cache.clear()
+        self.addCleanup(config_manager._moodle_config_cache.clear)
+
+    def write(self, content):
+        with open(self.path, 'w') as f:
+            f.write(content)
+
+    def test_reads_settings(self):
+        self.write("<?php\n$CFG->dbname = 'moodle';\n$CFG->dbuser  =  'moodleuser';\n$CFG->dbpass='s3crét';\n")
+        self.assertEqual(ConfigManager.read_moodle_config(self.path),
+                         {'dbname': 'moodle', 'dbuser': 'moodleuser', 'dbpass': 's3crét'})
+
+    def test_first_assignment_wins(self):
+        self.write("<?php\n$CFG->dbname = 'first';\n$CFG->dbname = 'second';\n$CFG->dbuser = 'user';\n")
+        self.assertEqual(ConfigManager.read_moodle_config(self.path),
+                         {'dbname': 'first', 'dbuser': 'user', 'dbpass': None})
+
+    def test_cached_until_modified(self):
+        self.write("<?php\n$CFG->dbname = 'old';\n")
+        mtime = os.stat(self.path).st_mtime_ns
+        self.assertEqual(ConfigManager.read_moodle_config(self.path)['dbname'], 'old')
+
+        # Same mtime: the cached values are returned without reading the file
+        self.write("<?php\n$CFG->dbname = 'new';\n")
+        os.utime(self.path, ns=(mtime, mtime))
+        self.assertEqual(ConfigManager.read_moodle_config(self.path)['dbname'], 'old')
+
+        os.utime(self.path, ns=(mtime + 10**9, mtime + 10**9))
+        self.assertEqual(ConfigManager.read_moodle_config(self.path)['dbname'], 'new')
+
+    def test_cached_values_are_copies(self):
+        self.write("<?php\n$CFG->dbname = 'moodle';\n")
+        ConfigManager.read_moodle_config(self.path)['dbname'] = 'changed'
+        self.assertEqual(ConfigManager.read_moodle_config(self.path)['dbname'], 'moodle')
+
+    def test_missing_file(self):
+        with self.assertLogs(level='ERROR'):
+            self.assertEqual(ConfigManager.read_moodle_config(self.path), {})
+
+
+class CheckConfigDifferencesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config_path = os.path.join(tmp.name, 'config.ini')
+        self.template_path = os.path.join(tmp.name, 'config_template.ini')
+
+    def differences(self, config, template):
+        with open(self.config_path, 'w') as f:
+            f.write(config)
+        with open(self.template_path, 'w') as f:
+            f.write(template)
+        with self.assertLogs(level='INFO') as logs:
+            ConfigManager.check_config_differences(self.config_path, self.template_path)
+        return [r.getMessage() for r in logs.records if r.levelno == logging.WARNING]
+
+    def test_grouped_per_section(self):
+        template = "[settings]\na = 1\nb = 2\n\n[logging]\nlevel = INFO\n"
+        config = "[settings]\na = 1\nb = 3\nc = 9\n\n[logging]\n"
+        self.assertEqual(self.differences(config, template), [
+            "Differences in section logging: Added={'level': 'INFO'}, Removed={}",
+            # A changed value is reported as Added (with the template's value)
+            "Differences in section settings: Added={'b': '2'}, Removed={'c': '9'}",
+        ])
+
+    def test_missing_section(self):
+        template = "[settings]\na = 1\n\n[database]\ndb_name = moodle\n"
+        config = "[settings]\na = 1\n"
+        self.assertEqual(self.differences(config, template), [
+            "Differences in section database: Added={'db_name': 'moodle'}, Removed={}",
+        ])
+
+    def test_identical(self):
+        template = "[settings]\na = 1\n"
+        self.assertEqual(self.differences(template, template), [])
+
+
+class BufferedRotatingFileHandlerTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'test.log')
+
+    def handler(self, max_bytes):
+        handler = BufferedRotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=2)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.addCleanup(handler.close)
+        return handler
+
+    @staticmethod
+    def record(msg, level=logging.INFO):
+        return logging.makeLogRecord({'msg': msg, 'levelno': level, 'levelname': logging.getLevelName(level)})
+
+    def sizes(self):
+        return [os.path.getsize(path) if os.path.exists(path) else None
+                for path in (self.path, self.path + '.1', self.path + '.2', self.path + '.3')]
+
+    def test_info_is_buffered_until_flush(self):
+        handler = self.handler(0)
+        handler.handle(self.record("buffered"))
+        self.assertEqual(os.path.getsize(self.path), 0)
+        handler.flush()
+        self.assertEqual(os.path.getsize(self.path), len("buffered\n"))
+
+    def test_warning_is_flushed(self):
+        handler = self.handler(0)
+        handler.handle(self.record("info"))
+        handler.handle(self.record("warning", logging.WARNING))
+        self.assertEqual(os.path.getsize(self.path), len("info\nwarning\n"))
+
+    def test_rollover(self):
+        handler = self.handler(100)
+        for _ in range(6):
+            handler.handle(self.record("x" * 39))  # 40 bytes per line
+        handler.flush()
+        # Two lines per file; the oldest ones are dropped after backupCount files
+        self.assertEqual(self.sizes(), [80, 80, 80, None])
+
+    def test_rollover_counts_bytes(self):
+        handler = self.handler(100)
+        for _ in range(6):
+            handler.handle(self.record("ä" * 20))  # 20 characters, 41 bytes per line
+        handler.flush()
+        self.assertEqual(self.sizes(), [82, 82, 82, None])
+
+    def test_appends_to_existing_file(self):
+        with open(self.path, 'w') as f:
+            f.write("y" * 90 + "\n")
+        handler = self.handler(100)
+        handler.handle(self.record("x" * 19))
+        handler.flush()
+        # The existing 91 bytes count towards maxBytes
+        self.assertEqual(self.sizes(), [20, 91, None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import grp
+import os
+import pwd
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from modules.moodle_backup import MoodleBackupManager
+
+
+def _git(*args):
+    """Run git with a throwaway identity and return its stripped stdout."""
+    result = subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def _chown_recursive(path, uid, gid):
+    os.chown(path, uid, gid)
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            os.lchown(os.path.join(dirpath, name), uid, gid)
+
+
+@unittest.skipUnless(hasattr(os, 'geteuid') and os.geteuid() == 0, "needs root to hand the checkout to another user")
+@unittest.skipUnless(shutil.which('git'), "needs git")
+class UpdateExistingCloneTest(unittest.TestCase):
+    """The in-place update has to work on a checkout owned by the web server user,
+    which is what every run after the first one finds (git's "dubious ownership" check)."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+        self.upstream = os.path.join(self.tmp, 'upstream')
+        _git('init', '-q', '-b', 'main', self.upstream)
+        _git('-C', self.upstream, 'commit', '-q', '--allow-empty', '-m', 'first')
+
+        www = os.path.join(self.tmp, 'www')
+        os.mkdir(www)
+        self.clone_path = os.path.join(www, 'moodle')
+        _git('clone', '-q', self.upstream, self.clone_path)
+
+        nobody = pwd.getpwnam('nobody')
+        self.user = nobody.pw_name
+        self.group = grp.getgrgid(nobody.pw_gid).gr_name
+        _chown_recursive(self.clone_path, nobody.pw_uid, nobody.pw_gid)
+
+        self.manager = MoodleBackupManager(path=www, moodle='moodle', folder_backup_path=os.path.join(self.tmp, 'backup'),
+                                           shallow_clone=False)
+
+    def test_checkout_owned_by_other_user_is_recognised(self):
+        self.assertTrue(MoodleBackupManager._is_checkout_of(self.clone_path, self.upstream))
+
+    def test_git_clone_updates_in_place(self):
+        _git('-C', self.upstream, 'commit', '-q', '--allow-empty', '-m', 'second')
+        inode = os.stat(self.clone_path).st_ino
+
+        self.manager.git_clone(None, self.upstream, 'main', False, self.user, self.group)
+
+        # Same directory (not removed and re-cloned), now at the new upstream tip
+        self.assertEqual(os.stat(self.clone_path).st_ino, inode)
+        self.assertEqual(
+            _git('-c', f'safe.directory={self.clone_path}', '-C', self.clone_path, 'rev-parse', 'HEAD'),
+            _git('-C', self.upstream, 'rev-parse', 'HEAD'),
+        )
+        self.assertFalse([name for name in os.listdir(os.path.dirname(self.clone_path)) if '.old-' in name])
+        self.assertEqual(os.stat(self.clone_path).st_uid, pwd.getpwnam(self.user).pw_uid)
+
+
+if __name__ == '__main__':
+    unittest.main()
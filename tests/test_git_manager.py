@@ -0,0 +1,43 @@
+import unittest
+
+from modules.git_manager import GitManager
+
+
+class ParseStatusTest(unittest.TestCase):
+    def test_clean_tracking_branch(self):
+        output = (
+            "# branch.oid 1234567890abcdef1234567890abcdef12345678\n"
+            "# branch.head main\n"
+            "# branch.upstream origin/main\n"
+            "# branch.ab +0 -0\n"
+        )
+        self.assertEqual(GitManager.parse_status(output),
+                         ("main", "1234567890abcdef1234567890abcdef12345678", "origin/main", False))
+
+    def test_local_changes(self):
+        output = (
+            "# branch.oid 1234567890abcdef1234567890abcdef12345678\n"
+            "# branch.head main\n"
+            "# branch.upstream origin/main\n"
+            "1 .M N... 100644 100644 100644 aaaaaaa bbbbbbb moodle_updater.py\n"
+        )
+        self.assertTrue(GitManager.parse_status(output)[3])
+
+    def test_untracked_file_is_a_local_change(self):
+        output = "# branch.oid abc\n# branch.head main\n? notes.txt\n"
+        self.assertTrue(GitManager.parse_status(output)[3])
+
+    def test_no_upstream(self):
+        output = "# branch.oid abc\n# branch.head feature\n"
+        self.assertEqual(GitManager.parse_status(output), ("feature", "abc", None, False))
+
+    def test_detached_head(self):
+        output = "# branch.oid abc\n# branch.head (detached)\n"
+        self.assertEqual(GitManager.parse_status(output), ("(detached)", "abc", None, False))
+
+    def test_empty_output(self):
+        self.assertEqual(GitManager.parse_status(""), ("Unknown", "Unknown", None, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
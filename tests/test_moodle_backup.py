@@ -0,0 +1,141 @@
+import errno
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from modules.moodle_backup import MoodleBackupManager, copy_file
+
+
+class CopyFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, 'src')
+        self.dst = os.path.join(self.tmp.name, 'dst')
+        self.data = os.urandom(300 * 1024)
+        with open(self.src, 'wb') as f:
+            f.write(self.data)
+
+    def read_dst(self):
+        with open(self.dst, 'rb') as f:
+            return f.read()
+
+    def test_copies_with_copy_file_range(self):
+        with mock.patch('os.copy_file_range', wraps=os.copy_file_range) as copy_file_range, \
+                mock.patch('os.sendfile') as sendfile:
+            copy_file(self.src, self.dst)
+        copy_file_range.assert_called()
+        sendfile.assert_not_called()
+        self.assertEqual(self.read_dst(), self.data)
+
+    def test_falls_back_to_sendfile(self):
+        refused = OSError(errno.EXDEV, "cross-device copy")
+        with mock.patch('os.copy_file_range', side_effect=refused), \
+                mock.patch('os.sendfile', wraps=os.sendfile) as sendfile:
+            copy_file(self.src, self.dst)
+        sendfile.assert_called()
+        self.assertEqual(self.read_dst(), self.data)
+
+    def test_falls_back_to_chunked_copy(self):
+        refused = OSError(errno.EINVAL, "not supported")
+        with mock.patch('os.copy_file_range', side_effect=refused), \
+                mock.patch('os.sendfile', side_effect=refused):
+            copy_file(self.src, self.dst)
+        self.assertEqual(self.read_dst(), self.data)
+
+    def test_fallback_replaces_partial_copy(self):
+        # copy_file_range fails after writing part of the file; the fallback starts over.
+        def partial_copy(src_fd, dst_fd, count):
+            os.write(dst_fd, b'partial')
+            raise OSError(errno.EIO, "failed midway")
+
+        with open(self.dst, 'wb') as f:
+            f.write(b'old content that is longer than the new one' * 10000)
+        with mock.patch('os.copy_file_range', side_effect=partial_copy):
+            copy_file(self.src, self.dst)
+        self.assertEqual(self.read_dst(), self.data)
+
+    def test_mode_applies_to_new_file(self):
+        old_umask = os.umask(0o022)
+        try:
+            copy_file(self.src, self.dst, mode=0o640)
+        finally:
+            os.umask(old_umask)
+        self.assertEqual(stat.S_IMODE(os.stat(self.dst).st_mode), 0o640)
+
+    def test_mode_keeps_existing_file(self):
+        with open(self.dst, 'wb'):
+            pass
+        os.chmod(self.dst, 0o644)
+        copy_file(self.src, self.dst, mode=0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(self.dst).st_mode), 0o644)
+        self.assertEqual(self.read_dst(), self.data)
+
+    def test_fsync(self):
+        with mock.patch('os.fsync') as fsync:
+            copy_file(self.src, self.dst)
+        fsync.assert_not_called()
+        with mock.patch('os.fsync') as fsync:
+            copy_file(self.src, self.dst, fsync=True)
+        fsync.assert_called_once()
+
+
+def _fake_rsync(output, returncode=0):
+    """Command line of a process that prints output (bytes) the way rsync would and exits with returncode."""
+    script = f"import sys; sys.stdout.buffer.write({output!r}); sys.exit({returncode})"
+    return [sys.executable, '-c', script]
+
+
+class RunRsyncTest(unittest.TestCase):
+    OUTPUT = (
+        b"      1,048,576  10%    1.00MB/s    0:00:01 (xfr#1, to-chk=9/10)\r"
+        b"     10,485,760 100%    5.00MB/s    0:00:02 (xfr#10, to-chk=0/10)\n"
+        b"\n"
+        b"Number of files: 10 (reg: 10)\n"
+        b"Total file size: 10,485,760 bytes\n"
+        b"Total transferred file size: 10,485,760 bytes\n"
+    )
+
+    def test_returns_total_file_size(self):
+        with self.assertLogs(level='INFO'):
+            total = MoodleBackupManager._run_rsync(_fake_rsync(self.OUTPUT))
+        self.assertEqual(total, 10485760)
+
+    def test_logs_progress_and_stats(self):
+        with self.assertLogs(level='INFO') as logs:
+            MoodleBackupManager._run_rsync(_fake_rsync(self.OUTPUT), log_interval=0)
+        messages = [record.getMessage() for record in logs.records]
+        self.assertIn("Backup progress: 1,048,576  10%    1.00MB/s    0:00:01 (xfr#1, to-chk=9/10)", messages)
+        self.assertIn("rsync: Number of files: 10 (reg: 10)", messages)
+        self.assertIn("rsync: Total file size: 10,485,760 bytes", messages)
+        # Progress lines are not logged a second time as plain rsync output
+        self.assertFalse([m for m in messages if m.startswith("rsync: ") and '%' in m])
+
+    def test_progress_is_rate_limited(self):
+        with self.assertLogs(level='INFO') as logs:
+            MoodleBackupManager._run_rsync(_fake_rsync(self.OUTPUT), log_interval=3600)
+        progress = [r for r in logs.records if r.getMessage().startswith("Backup progress:")]
+        self.assertEqual(len(progress), 1)
+
+    def test_without_stats(self):
+        with self.assertLogs(level='INFO'):
+            self.assertIsNone(MoodleBackupManager._run_rsync(_fake_rsync(b"sending incremental file list\n")))
+
+    def test_non_utf8_file_name(self):
+        with self.assertLogs(level='INFO') as logs:
+            MoodleBackupManager._run_rsync(_fake_rsync(b"file \xff\xfe.txt\n"))
+        self.assertEqual(logs.records[0].getMessage(), "rsync: file ��.txt")
+
+    def test_failure_raises(self):
+        with self.assertLogs(level='INFO'):
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                MoodleBackupManager._run_rsync(_fake_rsync(b"rsync error: some files vanished\n", 24))
+        self.assertEqual(cm.exception.returncode, 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
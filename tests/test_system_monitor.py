@@ -0,0 +1,38 @@
+import unittest
+from unittest import mock
+
+from modules.system_monitor import SystemMonitor
+
+MEMINFO = b"""MemTotal:        8000000 kB
+MemFree:         1024000 kB
+MemAvailable:    4096000 kB
+Buffers:          102400 kB
+Cached:          2048000 kB
+SwapCached:            0 kB
+Active:          3000000 kB
+Shmem:            204800 kB
+"""
+
+
+class ReadMemoryStatsTest(unittest.TestCase):
+    def test_parses_meminfo(self):
+        with mock.patch('builtins.open', mock.mock_open(read_data=MEMINFO)) as meminfo:
+            stats = SystemMonitor.read_memory_stats()
+        meminfo.assert_called_once_with('/proc/meminfo', 'rb')
+        # total, used (total - free - buff/cache), free, shared, buff/cache, available; kB >> 10
+        self.assertEqual(stats, (7812, 7812 - 1000 - 2100, 1000, 200, 2100, 4000))
+
+    def test_swap_cached_is_not_counted_as_cached(self):
+        data = MEMINFO.replace(b"SwapCached:            0 kB", b"SwapCached:       512000 kB")
+        with mock.patch('builtins.open', mock.mock_open(read_data=data)):
+            self.assertEqual(SystemMonitor.read_memory_stats()[4], 2100)
+
+    def test_reads_this_host(self):
+        total, used, free, shared, buff_cached, available = SystemMonitor.read_memory_stats()
+        self.assertGreater(total, 0)
+        self.assertLessEqual(free, total)
+        self.assertLessEqual(available, total)
+
+
+if __name__ == '__main__':
+    unittest.main()